@@ -0,0 +1,178 @@
+"""Deterministic stand-ins for Weaviate, OpenAI embeddings and the chat model used by load_test.py."""
+import hashlib
+import math
+import os
+import random
+import sys
+import time
+import types
+import uuid
+from types import SimpleNamespace
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.vectorstores import VectorStore
+
+EMBEDDING_DIMENSIONS = 64
+WEAVIATE_CLIENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "weaviate", "weaviate_client")
+
+TICKERS = ["AAPL", "MSFT", "NVDA", "AMZN", "TSLA", "META", "GOOGL", "JPM", "XOM", "NFLX"]
+TOPICS = ["earnings", "guidance", "layoffs", "buyback", "acquisition", "lawsuit", "dividend", "product launch"]
+
+
+def hashed_vector(text):
+    vector = []
+    seed = hashlib.sha256(text.lower().encode()).digest()
+    while len(vector) < EMBEDDING_DIMENSIONS:
+        seed = hashlib.sha256(seed).digest()
+        vector.extend(byte / 127.5 - 1 for byte in seed)
+    vector = vector[:EMBEDDING_DIMENSIONS]
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def sleep_ms(latency_ms, jitter=0.2):
+    if latency_ms > 0:
+        time.sleep(latency_ms * random.uniform(1 - jitter, 1 + jitter) / 1000)
+
+
+class FakeEmbeddings(Embeddings):
+    def __init__(self, latency_ms=0):
+        self.latency_ms = latency_ms
+
+    def embed_documents(self, texts):
+        sleep_ms(self.latency_ms)
+        return [hashed_vector(text) for text in texts]
+
+    def embed_query(self, text):
+        sleep_ms(self.latency_ms)
+        return hashed_vector(text)
+
+
+class FakeVectorStore(VectorStore):
+    def __init__(self, embedding, search_latency_ms=0):
+        self._embedding = embedding
+        self.search_latency_ms = search_latency_ms
+        self.documents = {}
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        store = cls(embedding)
+        store.add_texts(texts, metadatas)
+        return store
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = self._embedding.embed_documents(texts)
+        for doc_id, text, metadata, vector in zip(ids, texts, metadatas, vectors):
+            self.documents[doc_id] = (Document(page_content=text, metadata=dict(metadata)), vector)
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        for doc_id in ids or []:
+            self.documents.pop(doc_id, None)
+        return True
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        sleep_ms(self.search_latency_ms)
+        scored = sorted(
+            self.documents.values(),
+            key=lambda entry: -sum(a * b for a, b in zip(embedding, entry[1]))
+        )
+        return [document for document, _ in scored[:k]]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k=k, **kwargs)
+
+
+class FakeChatModel(BaseChatModel):
+    first_token_ms: float = 0
+    token_ms: float = 0
+    answer_tokens: int = 40
+
+    @property
+    def _llm_type(self):
+        return "fake-benchmark-chat"
+
+    def _tokens(self, messages):
+        prompt = messages[-1].content if messages else ""
+        rng = random.Random(hashlib.sha256(prompt.encode()).digest())
+        words = [rng.choice(TICKERS + TOPICS + ["shares", "rose", "fell", "analysts", "quarter"]) for _ in range(self.answer_tokens)]
+        return [word + " " for word in words]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        sleep_ms(self.first_token_ms + self.token_ms * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens).strip()))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        sleep_ms(self.first_token_ms)
+        for token in self._tokens(messages):
+            sleep_ms(self.token_ms)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class FakeCollection:
+    def __init__(self, vectorstore):
+        self.aggregate = SimpleNamespace(
+            over_all=lambda total_count=True: SimpleNamespace(total_count=len(vectorstore.documents))
+        )
+
+
+class FakeWeaviateClient:
+    def __init__(self, vectorstore):
+        self.collections = SimpleNamespace(get=lambda name: FakeCollection(vectorstore))
+
+    def is_ready(self):
+        return True
+
+
+def seed_articles(vectorstore, count):
+    rng = random.Random(0)
+    texts = []
+    metadatas = []
+    for index in range(count):
+        ticker = rng.choice(TICKERS)
+        topic = rng.choice(TOPICS)
+        texts.append(f"{ticker} reported {topic} news. " + " ".join(rng.choice(TOPICS) for _ in range(60)))
+        metadatas.append({"url": f"https://news.example.com/{ticker.lower()}/{index}", "title": f"{ticker} {topic}"})
+    vectorstore.add_texts(texts, metadatas)
+
+
+def install_fake_weaviate(embedding_latency_ms=0, search_latency_ms=0, articles=200):
+    """Register fake weaviate_client modules so the Weaviate service imports them instead of connecting."""
+    from utils.embedding_cache import CachedEmbeddings
+    from utils.tracing import TimedEmbeddings
+
+    # Layered like weaviate_client/vectorstore.py; the cache stays in memory so runs start cold.
+    base_embedding = FakeEmbeddings(embedding_latency_ms)
+    if os.environ.get("EMBEDDING_CACHE_ENABLED", "true").lower() == "true":
+        base_embedding = CachedEmbeddings(base_embedding, "benchmark", db_path="")
+    embedding = TimedEmbeddings(base_embedding)
+    vectorstore = FakeVectorStore(embedding, search_latency_ms)
+    seed_articles(vectorstore, articles)
+    client = FakeWeaviateClient(vectorstore)
+
+    package = types.ModuleType("weaviate_client")
+    # Modules other than the two replaced here (such as indexing) still load from the real package.
+    package.__path__ = [WEAVIATE_CLIENT_DIR]
+    client_module = types.ModuleType("weaviate_client.client")
+    client_module.client = client
+    vectorstore_module = types.ModuleType("weaviate_client.vectorstore")
+    vectorstore_module.embedding = embedding
+    vectorstore_module.vectorstore = vectorstore
+    package.client = client_module
+    package.vectorstore = vectorstore_module
+
+    sys.modules["weaviate_client"] = package
+    sys.modules["weaviate_client.client"] = client_module
+    sys.modules["weaviate_client.vectorstore"] = vectorstore_module
+    return vectorstore
@@ -0,0 +1,477 @@
+"""Offline end-to-end load test for the API server and the Weaviate query service.
+
+Both Flask apps are booted in-process on local ports. DynamoDB, CloudWatch Logs and CloudWatch
+metrics are served by moto, Weaviate is replaced by an in-memory vector store and the OpenAI
+embedding/chat models by deterministic fakes with configurable latency (see fakes.py).
+
+Virtual users register once, then loop over a weighted mix of login, chat, history, list and
+delete calls. Per-endpoint requests/sec and p50/p95/p99 latencies, plus the per-stage chat timings
+the services report (Server-Timing, or the final stream event), are written as JSON so runs can be
+diffed between commits:
+
+    pip install -r app/benchmarks/requirements.txt
+    python app/benchmarks/load_test.py --users 16 --duration 60 --output results.json
+
+Any environment variable the services read can be overridden with --env KEY=VALUE.
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+SERVER_DIR = BENCHMARK_DIR.parent / "server"
+WEAVIATE_DIR = BENCHMARK_DIR.parent / "weaviate"
+
+AWS_REGION = "us-east-1"
+USERS_TABLE = "bench-users"
+CHAT_TABLE = "bench-chat"
+ARTICLES_TABLE = "bench-articles"
+
+DEFAULT_ENV = {
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_SESSION_TOKEN": "testing",
+    "AWS_REGION": AWS_REGION,
+    "AWS_DEFAULT_REGION": AWS_REGION,
+    "DYNAMODB_USERS_TABLE": USERS_TABLE,
+    "DYNAMODB_CHAT_TABLE": CHAT_TABLE,
+    "DYNAMODB_ARTICLES_TABLE": ARTICLES_TABLE,
+    "DYNAMODB_CHAT_SCHEMA": "composite",
+    "VITE_JWT_SECRET_KEY": "benchmark-secret-key-of-at-least-32-bytes",
+    "FRONTEND_URLS": "http://localhost",
+    "SERVER_LOG_GROUP": "bench-server",
+    "SERVER_LOG_STREAM": "bench",
+    "WEAVIATE_LOG_GROUP": "bench-weaviate",
+    "WEAVIATE_LOG_STREAM": "bench",
+    "WEAVIATE_URL": "localhost",
+    "WEAVIATE_API_KEY": "unused",
+    "WEAVIATE_CLASS": "Article",
+    "OPENAI_API_KEY": "unused",
+    "OPENAI_MODEL": "gpt-3.5-turbo",
+    "OPENAI_TEMPERATURE": "0",
+    "CHAT_RATE_LIMIT_PER_MINUTE": "1000000",
+    "CHAT_RATE_LIMIT_BURST": "1000000",
+    "BCRYPT_ROUNDS": "12",
+}
+
+DEFAULT_MIX = "login=1,chat=6,history=3,list=3,delete=1"
+
+QUESTIONS = [
+    "What did {ticker} say about {topic}?",
+    "How did the market react to {ticker} {topic}?",
+    "Summarize the latest {topic} news for {ticker}.",
+    "Is {ticker} planning any {topic} this quarter?",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of load before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted operation mix (default {DEFAULT_MIX})")
+    parser.add_argument("--stream", action="store_true", help="use streaming /chat responses")
+    parser.add_argument("--num-sources", type=int, default=3, help="num_sources sent with each chat")
+    parser.add_argument("--articles", type=int, default=200, help="documents seeded into the fake vector store")
+    parser.add_argument("--llm-first-token-ms", type=float, default=300, help="fake LLM latency before the first token")
+    parser.add_argument("--llm-token-ms", type=float, default=10, help="fake LLM latency per token")
+    parser.add_argument("--llm-tokens", type=int, default=40, help="tokens per fake answer")
+    parser.add_argument("--embedding-ms", type=float, default=40, help="fake embedding latency per call")
+    parser.add_argument("--search-ms", type=float, default=15, help="fake vector search latency")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="override a service environment variable")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the workload")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    return parser.parse_args()
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("login", "chat", "history", "list", "delete"):
+            raise SystemExit(f"Unknown operation in --mix: {name}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def configure_environment(overrides):
+    for key, value in DEFAULT_ENV.items():
+        os.environ[key] = value
+    for override in overrides:
+        key, _, value = override.partition("=")
+        os.environ[key] = value
+
+    # The server package is named "app" and the Weaviate service has an app.py, so the server
+    # directory must come first and the Weaviate entry point is loaded from its file path.
+    sys.path[:0] = [str(SERVER_DIR), str(WEAVIATE_DIR)]
+
+
+def create_tables():
+    import boto3
+
+    dynamodb = boto3.resource("dynamodb", region_name=AWS_REGION)
+    dynamodb.create_table(
+        TableName=USERS_TABLE,
+        KeySchema=[{"AttributeName": "user_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "user_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST"
+    )
+    dynamodb.create_table(
+        TableName=CHAT_TABLE,
+        KeySchema=[
+            {"AttributeName": "user_id", "KeyType": "HASH"},
+            {"AttributeName": "chat_key", "KeyType": "RANGE"}
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "user_id", "AttributeType": "S"},
+            {"AttributeName": "chat_key", "AttributeType": "S"},
+            {"AttributeName": "last_used", "AttributeType": "S"}
+        ],
+        GlobalSecondaryIndexes=[{
+            "IndexName": "user_id-last_used-index",
+            "KeySchema": [
+                {"AttributeName": "user_id", "KeyType": "HASH"},
+                {"AttributeName": "last_used", "KeyType": "RANGE"}
+            ],
+            "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["chat_id", "title", "message_count"]}
+        }],
+        BillingMode="PAY_PER_REQUEST"
+    )
+    dynamodb.create_table(
+        TableName=ARTICLES_TABLE,
+        KeySchema=[{"AttributeName": "article_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "article_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST"
+    )
+
+
+def serve(app):
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def start_weaviate_service(args):
+    from fakes import FakeChatModel, install_fake_weaviate
+
+    install_fake_weaviate(args.embedding_ms, args.search_ms, args.articles)
+
+    spec = importlib.util.spec_from_file_location("weaviate_service", WEAVIATE_DIR / "app.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    def fake_chat_model(**kwargs):
+        return FakeChatModel(
+            first_token_ms=args.llm_first_token_ms,
+            token_ms=args.llm_token_ms,
+            answer_tokens=args.llm_tokens
+        )
+
+    sys.modules["utils.chain_factory"].ChatOpenAI = fake_chat_model
+    return serve(module.app)
+
+
+def start_api_server(query_url):
+    os.environ.setdefault("QUERY_TASK_API_URL", query_url)
+    from app import create_app
+
+    return serve(create_app())
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.stages = defaultdict(list)
+        self.recording = False
+
+    def record_stage(self, stage, duration_ms):
+        if not self.recording:
+            return
+        with self.lock:
+            self.stages[stage].append(duration_ms)
+
+    def record(self, endpoint, status, latency_ms, ok):
+        if not self.recording:
+            return
+        with self.lock:
+            self.samples[endpoint].append(latency_ms)
+            self.statuses[endpoint][str(status)] += 1
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return round(sorted_values[index], 2)
+
+
+def parse_server_timing(header):
+    timings = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        if params.strip().startswith("dur="):
+            timings[name.strip()] = float(params.strip()[4:])
+    return timings
+
+
+def summarize_stages(stages):
+    summary = {}
+    for stage, samples in sorted(stages.items()):
+        values = sorted(samples)
+        summary[stage] = {
+            "samples": len(values),
+            "mean_ms": round(sum(values) / len(values), 2),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99)
+        }
+    return summary
+
+
+def summarize(samples, errors, statuses, duration):
+    values = sorted(samples)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "requests_per_sec": round(len(values) / duration, 2),
+        "mean_ms": round(sum(values) / len(values), 2) if values else None,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": round(values[-1], 2) if values else None,
+        "status_codes": dict(statuses)
+    }
+
+
+class VirtualUser:
+    def __init__(self, base_url, recorder, args, weights, rng):
+        import requests
+
+        self.session = requests.Session()
+        self.base_url = base_url
+        self.recorder = recorder
+        self.args = args
+        self.rng = rng
+        self.operations = list(weights)
+        self.weights = [weights[name] for name in self.operations]
+        self.email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+        self.password = uuid.uuid4().hex
+        self.token = None
+        self.chat_ids = []
+
+    def call(self, endpoint, method, path, expected, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=120, **kwargs)
+            response.content
+            status = response.status_code
+        except Exception:
+            response, status = None, "exception"
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.recorder.record(endpoint, status, latency_ms, status in expected)
+        return response
+
+    def auth(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def register(self):
+        body = {"name": "Benchmark User", "email": self.email, "password": self.password}
+        response = self.call("register", "POST", "/register", (201,), json=body)
+        if response is None or response.status_code != 201:
+            raise RuntimeError(f"Registration failed for {self.email}: {getattr(response, 'text', 'no response')}")
+        self.login()
+        if not self.token:
+            raise RuntimeError(f"Login failed for {self.email}")
+
+    def login(self):
+        response = self.call("login", "POST", "/login", (200,), json={"email": self.email, "password": self.password})
+        if response is not None and response.status_code == 200:
+            self.token = response.json()["access_token"]
+
+    def question(self):
+        from fakes import TICKERS, TOPICS
+
+        template = self.rng.choice(QUESTIONS)
+        return template.format(ticker=self.rng.choice(TICKERS), topic=self.rng.choice(TOPICS))
+
+    def chat(self):
+        if not self.chat_ids or self.rng.random() < 0.3:
+            self.chat_ids.append(str(uuid.uuid4()))
+        body = {
+            "message": self.question(),
+            "chat_id": self.rng.choice(self.chat_ids),
+            "num_sources": self.args.num_sources,
+            "stream": self.args.stream
+        }
+        if not self.args.stream:
+            response = self.call("chat", "POST", "/chat", (200,), json=body, headers=self.auth())
+            if response is not None and response.status_code == 200:
+                self.record_stages(parse_server_timing(response.headers.get("Server-Timing")))
+            return
+
+        start = time.perf_counter()
+        status, ok, first_token_ms = "exception", False, None
+        try:
+            with self.session.post(self.base_url + "/chat", json=body, headers=self.auth(), stream=True, timeout=120) as response:
+                status = response.status_code
+                ok = status == 200
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if event.get("type") == "token" and first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - start) * 1000
+                    elif event.get("type") == "done":
+                        self.record_stages(event.get("timings") or {})
+                    elif event.get("type") == "error":
+                        ok = False
+        except Exception:
+            ok = False
+        self.recorder.record("chat", status, (time.perf_counter() - start) * 1000, ok)
+        if first_token_ms is not None:
+            self.recorder.record("chat_first_token", status, first_token_ms, ok)
+
+    def record_stages(self, timings):
+        for stage, duration_ms in timings.items():
+            self.recorder.record_stage(stage, float(duration_ms))
+
+    def history(self):
+        if not self.chat_ids:
+            return self.chat()
+        params = {"chat_id": self.rng.choice(self.chat_ids)}
+        self.call("history", "GET", "/chat-history", (200,), params=params, headers=self.auth())
+
+    def list(self):
+        self.call("list", "GET", "/chats", (200,), headers=self.auth())
+
+    def delete(self):
+        if not self.chat_ids:
+            return self.chat()
+        chat_id = self.chat_ids.pop(self.rng.randrange(len(self.chat_ids)))
+        self.call("delete", "DELETE", "/delete-chat", (202,), params={"chat_id": chat_id}, headers=self.auth())
+
+    def run(self, deadline):
+        while time.monotonic() < deadline:
+            operation = self.rng.choices(self.operations, weights=self.weights)[0]
+            getattr(self, operation)()
+
+
+def run_workload(base_url, args, weights):
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    users = [VirtualUser(base_url, recorder, args, weights, random.Random(rng.random())) for _ in range(args.users)]
+
+    recorder.recording = True
+    setup_started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(users)) as pool:
+        for future in [pool.submit(user.register) for user in users]:
+            future.result()
+    setup_seconds = time.monotonic() - setup_started
+    registration = summarize(recorder.samples.pop("register", []), recorder.errors.pop("register", 0), recorder.statuses.pop("register", {}), setup_seconds)
+    recorder.samples.clear()
+    recorder.errors.clear()
+    recorder.statuses.clear()
+    recorder.stages.clear()
+
+    recorder.recording = False
+    measure_start = time.monotonic() + args.warmup
+    deadline = measure_start + args.duration
+    threads = [threading.Thread(target=user.run, args=(deadline,)) for user in users]
+    for thread in threads:
+        thread.start()
+
+    time.sleep(max(0, measure_start - time.monotonic()))
+    recorder.recording = True
+    for thread in threads:
+        thread.join()
+    recorder.recording = False
+    duration = time.monotonic() - measure_start
+
+    endpoints = {
+        endpoint: summarize(recorder.samples[endpoint], recorder.errors[endpoint], recorder.statuses[endpoint], duration)
+        for endpoint in sorted(recorder.samples)
+    }
+    totals = summarize(
+        [value for endpoint, values in recorder.samples.items() if endpoint != "chat_first_token" for value in values],
+        sum(count for endpoint, count in recorder.errors.items() if endpoint != "chat_first_token"),
+        {},
+        duration
+    )
+    totals.pop("status_codes")
+    return registration, endpoints, totals, summarize_stages(recorder.stages), duration
+
+
+def print_report(report):
+    print(f"\n{'endpoint':<18}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = dict(report["endpoints"])
+    rows["total"] = report["total"]
+    for endpoint, stats in rows.items():
+        print(
+            f"{endpoint:<18}{stats['requests']:>10}{stats['errors']:>8}{stats['requests_per_sec']:>10}"
+            f"{stats['p50_ms'] or '-':>10}{stats['p95_ms'] or '-':>10}{stats['p99_ms'] or '-':>10}"
+        )
+
+    if report["chat_stages"]:
+        print(f"\n{'chat stage':<28}{'samples':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for stage, stats in report["chat_stages"].items():
+            print(f"{stage:<28}{stats['samples']:>10}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+
+def main():
+    args = parse_args()
+    weights = parse_mix(args.mix)
+    configure_environment(args.env)
+    started_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    from moto import mock_aws
+
+    # Left active until exit so the services' atexit log and metric flushes still reach moto.
+    mock_aws().start()
+    create_tables()
+    weaviate_server, weaviate_url = start_weaviate_service(args)
+    api_server, api_url = start_api_server(f"{weaviate_url}/api/query-answer")
+
+    try:
+        registration, endpoints, totals, stages, duration = run_workload(api_url, args, weights)
+    finally:
+        api_server.shutdown()
+        weaviate_server.shutdown()
+
+    report = {
+        "started_at": started_at,
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "mix": weights,
+        "duration_seconds": round(duration, 2),
+        "registration": registration,
+        "endpoints": endpoints,
+        "total": totals,
+        "chat_stages": stages
+    }
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -41,8 +41,21 @@ export type ChatRequest = {
   message: string;
   chat_id: string;
   num_sources?: number;
+  stream?: boolean;
+  filters?: {
+    published_after?: string;
+    published_before?: string;
+    sources?: string[];
+  };
+  alpha?: number;
 };
 
+export type ChatStreamEvent =
+  | { type: "token"; content: string }
+  | { type: "sources"; sources: ChatResponse["sources"] }
+  | { type: "done"; timings?: Record<string, number> }
+  | { type: "error"; error: string };
+
 export const chatApi = {
   getChatHistory: async (token: string): Promise<ChatHistoryResponse> => {
     const response = await fetch(`${import.meta.env.VITE_BACKEND_URL}/chats`, {
@@ -93,4 +106,60 @@ export const chatApi = {
     const data = await response.json();
     return data;
   },
-}; 
\ No newline at end of file
+
+  sendMessageStream: async (
+    token: string,
+    message: string,
+    chatId: string,
+    numSources: number = 3,
+    onToken: (content: string) => void = () => {}
+  ): Promise<ChatResponse> => {
+    const response = await fetch(`${import.meta.env.VITE_BACKEND_URL}/chat`, {
+      method: 'POST',
+      headers: {
+        'Authorization': `Bearer ${token}`,
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        message,
+        chat_id: chatId,
+        num_sources: numSources,
+        stream: true
+      }),
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error("Failed to send message");
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const result: ChatResponse = { response: "", sources: [] };
+    let buffer = "";
+
+    const handleLine = (line: string) => {
+      if (!line.trim()) return;
+      const event = JSON.parse(line) as ChatStreamEvent;
+      if (event.type === "token") {
+        result.response += event.content;
+        onToken(result.response);
+      } else if (event.type === "sources") {
+        result.sources = event.sources;
+      } else if (event.type === "error") {
+        throw new Error(event.error);
+      }
+    };
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split("\n");
+      buffer = lines.pop() ?? "";
+      lines.forEach(handleLine);
+    }
+    handleLine(buffer + decoder.decode());
+
+    return result;
+  },
+};
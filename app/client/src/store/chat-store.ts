@@ -251,17 +251,18 @@ const storeFactory = (set: any, get: any) => ({
       return;
     }
 
+    let chatId = get().currentChatId;
+    const streamingId = crypto.randomUUID();
+
     try {
       set({ isLoading: true, error: null });
 
-      let chatId = get().currentChatId;
       if (!chatId) {
         chatId = get().createChat();
       }
 
       get().addMessage(message, "user");
 
-      const streamingId = crypto.randomUUID();
       set((state: any) => ({
         chats: state.chats.map((chat: any) =>
           chat.id === chatId
@@ -282,7 +283,20 @@ const storeFactory = (set: any, get: any) => ({
         ),
       }));
 
-      const response = await chatApi.sendMessage(token, message, chatId, numSources);
+      const response = await chatApi.sendMessageStream(token, message, chatId, numSources, (partial) => {
+        set((state: any) => ({
+          chats: state.chats.map((chat: any) =>
+            chat.id === chatId
+              ? {
+                  ...chat,
+                  messages: chat.messages.map((msg: any) =>
+                    msg.id === streamingId ? { ...msg, content: partial } : msg
+                  ),
+                }
+              : chat
+          ),
+        }));
+      });
 
       set((state: any) => ({
         chats: state.chats.map((chat: any) =>
@@ -305,10 +319,16 @@ const storeFactory = (set: any, get: any) => ({
         isLoading: false,
       }));
     } catch (error) {
-      set({
+      // Drop the assistant placeholder so a failed send does not leave an empty bubble behind.
+      set((state: any) => ({
+        chats: state.chats.map((chat: any) =>
+          chat.id === chatId
+            ? { ...chat, messages: chat.messages.filter((msg: any) => msg.id !== streamingId) }
+            : chat
+        ),
         error: 'Failed to send message. Please try again.',
         isLoading: false,
-      });
+      }));
     }
   },
 });
@@ -1,25 +1,42 @@
+import time
+
+_import_started = time.perf_counter()
+
 from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from instance.config import get_env_variable
 from .routes import bp as api_bp
 from .auth import auth_bp
+from .aws_clients import init_timings
+from .utils.tracing import REQUEST_ID_HEADER, SERVER_TIMING_HEADER, init_tracing
+from .utils.cloudwatch_utils import get_logger, publish_metric
 
 JWT_SECRET_KEY = get_env_variable("VITE_JWT_SECRET_KEY")
 ALLOWED_ORIGINS = get_env_variable("FRONTEND_URLS").split(",")
 
 jwt = JWTManager()
+logger = get_logger()
+
+IMPORT_TIME_MS = (time.perf_counter() - _import_started) * 1000
 
 def create_app():
+    start_time = time.perf_counter()
     app = Flask(__name__)
     app.config["JWT_SECRET_KEY"] = JWT_SECRET_KEY
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = 900
     app.config["JWT_REFRESH_TOKEN_EXPIRES"] = 86400
 
-    CORS(app, origins=ALLOWED_ORIGINS, supports_credentials=True)
+    CORS(app, origins=ALLOWED_ORIGINS, supports_credentials=True, expose_headers=[REQUEST_ID_HEADER, SERVER_TIMING_HEADER])
     jwt.init_app(app)
+    init_tracing(app)
 
     app.register_blueprint(api_bp)
     app.register_blueprint(auth_bp)
 
+    create_app_ms = (time.perf_counter() - start_time) * 1000
+    logger.info(f"[STARTUP] Imports took {IMPORT_TIME_MS:.1f} ms, create_app took {create_app_ms:.1f} ms, AWS clients initialized so far: {init_timings}")
+    publish_metric("StartupImportMs", IMPORT_TIME_MS, unit="Milliseconds")
+    publish_metric("StartupCreateAppMs", create_app_ms, unit="Milliseconds")
+
     return app
\ No newline at end of file
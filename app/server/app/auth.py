@@ -6,7 +6,8 @@ from flask_jwt_extended import (
     jwt_required,
     get_jwt_identity
 )
-from app.models.user_model import create_user, get_user, verify_password, get_user_by_email
+from app.models.user_model import create_user, get_user, verify_password, get_user_by_email, rehash_password_if_needed
+from app.utils.password_hasher import PasswordHasherBusy
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -22,8 +23,11 @@ def register():
 
     user_id = str(uuid.uuid4())
 
-    if not create_user(user_id, name, email, password):
-        return jsonify({"error": "User already exists"}), 409
+    try:
+        if not create_user(user_id, name, email, password):
+            return jsonify({"error": "User already exists"}), 409
+    except PasswordHasherBusy:
+        return jsonify({"error": "Server busy, please retry"}), 503, {"Retry-After": "1"}
 
     return jsonify({
         "message": "Register successful",
@@ -43,9 +47,14 @@ def login():
     if not email or not password:
         return jsonify({"error": "email and password required"}), 400
 
-    user = get_user_by_email(email)
-    if not user or not verify_password(password, user["password_hash"]):
-        return jsonify({"error": "Invalid credentials"}), 401
+    try:
+        user = get_user_by_email(email)
+        if not user or not verify_password(password, user["password_hash"]):
+            return jsonify({"error": "Invalid credentials"}), 401
+    except PasswordHasherBusy:
+        return jsonify({"error": "Server busy, please retry"}), 503, {"Retry-After": "1"}
+
+    rehash_password_if_needed(user["user_id"], password, user["password_hash"])
 
     access_token = create_access_token(identity=user["user_id"])
     refresh_token = create_refresh_token(identity=user["user_id"])
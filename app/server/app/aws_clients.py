@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+import boto3
+from instance.config import get_env_variable
+
+# One boto3 session per process, created on first use. Clients and resources built from it are
+# cached and reused across requests; after a fork (pre-fork worker spawn) everything is rebuilt
+# because sessions and their connection pools must not be shared between processes.
+_lock = threading.RLock()
+_pid = None
+_session = None
+_clients = {}
+_resources = {}
+_tables = {}
+init_timings = {}
+
+
+def _reset_if_forked():
+    global _pid, _session
+    if _pid != os.getpid():
+        _pid = os.getpid()
+        _session = None
+        _clients.clear()
+        _resources.clear()
+        _tables.clear()
+
+
+def _timed(name, factory):
+    start_time = time.perf_counter()
+    value = factory()
+    init_timings[name] = round((time.perf_counter() - start_time) * 1000, 2)
+    return value
+
+
+def get_session() -> boto3.session.Session:
+    global _session
+    with _lock:
+        _reset_if_forked()
+        if _session is None:
+            _session = _timed("session", lambda: boto3.session.Session(
+                aws_access_key_id=get_env_variable("AWS_ACCESS_KEY_ID"),
+                aws_secret_access_key=get_env_variable("AWS_SECRET_ACCESS_KEY"),
+                aws_session_token=get_env_variable("AWS_SESSION_TOKEN"),
+                region_name=get_env_variable("AWS_REGION")
+            ))
+        return _session
+
+
+def get_client(service: str):
+    with _lock:
+        _reset_if_forked()
+        if service not in _clients:
+            session = get_session()
+            _clients[service] = _timed(f"client:{service}", lambda: session.client(service))
+        return _clients[service]
+
+
+def get_resource(service: str):
+    with _lock:
+        _reset_if_forked()
+        if service not in _resources:
+            session = get_session()
+            _resources[service] = _timed(f"resource:{service}", lambda: session.resource(service))
+        return _resources[service]
+
+
+def get_table(table_name: str):
+    with _lock:
+        _reset_if_forked()
+        if table_name not in _tables:
+            _tables[table_name] = get_resource("dynamodb").Table(table_name)
+        return _tables[table_name]
+
+
+class LazyTable:
+    """Stands in for a DynamoDB Table at import time and resolves it from the registry on first use."""
+
+    def __init__(self, table_name: str):
+        self.table_name = table_name
+
+    def __getattr__(self, name):
+        return getattr(get_table(self.table_name), name)
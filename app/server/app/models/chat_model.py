@@ -1,34 +1,255 @@
+import base64
+import json
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from boto3.dynamodb.conditions import Key, Attr
-from app.dynamo_utils import get_dynamodb_resource
+from app.dynamo_utils import get_dynamodb_resource, get_dynamodb_table
+from app.utils.write_behind import WriteBehindBuffer
+from app.utils.tracing import span
+from app.utils.cloudwatch_utils import get_logger
 from instance.config import get_env_variable
 
 CHAT_TABLE = get_env_variable("DYNAMODB_CHAT_TABLE")
-dynamodb = get_dynamodb_resource()
-chat_table = dynamodb.Table(CHAT_TABLE)
+# "legacy": sort key is time_stamp and per-chat reads filter the whole user partition.
+# "composite": sort key is chat_key = "<chat_id>#<time_stamp>", so per-chat reads are key conditions.
+# Opt in to "composite" only once the table has been migrated (scripts/migrate_chat_keys.py).
+CHAT_SCHEMA = get_env_variable("DYNAMODB_CHAT_SCHEMA", default="legacy")
+SORT_KEY = "chat_key" if CHAT_SCHEMA == "composite" else "time_stamp"
+# Per-chat summary records share the user's partition; "#" sorts before any chat_id so they cluster first.
+THREAD_PREFIX = "#thread#"
+THREAD_TITLE_LENGTH = 100
+# Sparse GSI (user_id HASH, last_used RANGE): only thread summaries carry last_used, so it holds one item per chat.
+THREADS_INDEX = get_env_variable("DYNAMODB_CHAT_THREADS_INDEX", default="user_id-last_used-index")
+# "sync" writes each turn inline; "write_behind" persists both turns of an exchange from a background thread.
+CHAT_WRITE_MODE = get_env_variable("CHAT_WRITE_MODE", default="sync")
+CHAT_WRITE_BUFFER_SIZE = int(get_env_variable("CHAT_WRITE_BUFFER_SIZE", default=1000))
+# batch_write_item accepts at most 25 put requests per call.
+BATCH_WRITE_SIZE = 25
+DELETE_PARALLELISM = int(get_env_variable("CHAT_DELETE_PARALLELISM", default=4))
+DELETE_CHUNK_SIZE = BATCH_WRITE_SIZE * 4
+# How long a delete waits for this process's buffered writes to the same chats to land first.
+DELETE_FLUSH_TIMEOUT = float(get_env_variable("CHAT_DELETE_FLUSH_TIMEOUT", default=5))
+# Legacy-schema history reads filter the user's partition, so they page newest first and stop after this many pages.
+HISTORY_PAGE_SIZE = int(get_env_variable("CHAT_HISTORY_PAGE_SIZE", default=50))
+HISTORY_MAX_PAGES = int(get_env_variable("CHAT_HISTORY_MAX_PAGES", default=5))
 
-def store_message(user_id: str, chat_id: str, role: str, message: str, sources: list[str]):
+chat_table = get_dynamodb_table(CHAT_TABLE)
+logger = get_logger()
+
+def encode_cursor(last_evaluated_key):
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode("utf-8")).decode("utf-8")
+
+def decode_cursor(cursor: str, user_id: str, key_names: tuple) -> dict:
+    """Decode a cursor and check it is a start key for this user's query, so DynamoDB never sees a forged one."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("utf-8")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, dict) or set(key) != set(key_names):
+        raise ValueError("Invalid cursor")
+    if not all(isinstance(value, str) for value in key.values()) or key["user_id"] != user_id:
+        raise ValueError("Invalid cursor")
+    return key
+
+def _query_page(user_id: str, key_names: tuple, limit: int = None, cursor: str = None, **query):
+    if limit:
+        query["Limit"] = limit
+    if cursor:
+        query["ExclusiveStartKey"] = decode_cursor(cursor, user_id, key_names)
+    response = chat_table.query(**query)
+    return response.get("Items", []), encode_cursor(response.get("LastEvaluatedKey"))
+
+def _iter_query(max_pages: int = None, **query):
+    pages = 0
+    while True:
+        response = chat_table.query(**query)
+        yield from response.get("Items", [])
+        pages += 1
+        if "LastEvaluatedKey" not in response or (max_pages and pages >= max_pages):
+            return
+        query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+def make_chat_key(chat_id: str, time_stamp: str) -> str:
+    return f"{chat_id}#{time_stamp}"
+
+def _chat_query(user_id: str, chat_id: str) -> dict:
+    if CHAT_SCHEMA == "composite":
+        return {"KeyConditionExpression": Key("user_id").eq(user_id) & Key("chat_key").begins_with(f"{chat_id}#")}
+    return {
+        "KeyConditionExpression": Key("user_id").eq(user_id),
+        "FilterExpression": Attr("chat_id").eq(chat_id)
+    }
+
+def _item_key(item: dict) -> dict:
+    return {"user_id": item["user_id"], SORT_KEY: item[SORT_KEY]}
+
+def _thread_key(user_id: str, chat_id: str) -> dict:
+    return {"user_id": user_id, "chat_key": f"{THREAD_PREFIX}{chat_id}"}
+
+def _update_thread(user_id: str, chat_id: str, last_used: str, count: int, title: str = None):
+    update_expression = "SET chat_id = :chat_id, last_used = :ts ADD message_count :count"
+    values = {":chat_id": chat_id, ":ts": last_used, ":count": count}
+
+    if title is not None:
+        update_expression = "SET chat_id = :chat_id, last_used = :ts, title = if_not_exists(title, :title) ADD message_count :count"
+        values[":title"] = title[:THREAD_TITLE_LENGTH]
+
+    chat_table.update_item(
+        Key=_thread_key(user_id, chat_id),
+        UpdateExpression=update_expression,
+        ExpressionAttributeValues=values
+    )
+
+def _update_threads(items: list[dict]):
+    if CHAT_SCHEMA != "composite":
+        return
+
+    threads = {}
+    for item in sorted(items, key=lambda x: x["time_stamp"]):
+        thread = threads.setdefault((item["user_id"], item["chat_id"]), {"last_used": item["time_stamp"], "count": 0, "title": None})
+        thread["last_used"] = item["time_stamp"]
+        thread["count"] += 1
+        if item["role"] == "user" and thread["title"] is None:
+            thread["title"] = item["message"]
+
+    for (user_id, chat_id), thread in threads.items():
+        _update_thread(user_id, chat_id, thread["last_used"], thread["count"], thread["title"])
+
+def _build_item(user_id: str, chat_id: str, role: str, message: str, sources: list[str]) -> dict:
     time_stamp = datetime.now(timezone.utc).isoformat()
 
-    chat_table.put_item(Item={
+    item = {
         "user_id": user_id,
         "time_stamp": time_stamp,
         "chat_id": chat_id,
         "role": role,
         "message": message,
         "sources": sources
-    })
+    }
+    if CHAT_SCHEMA == "composite":
+        item["chat_key"] = make_chat_key(chat_id, time_stamp)
+
+    return item
+
+def _put_item(item: dict):
+    with span("db_write"):
+        chat_table.put_item(Item=item)
+    with span("thread_update"):
+        _update_threads([item])
+
+def _write_items(items: list[dict]) -> list[dict]:
+    """Batch-put items and return the ones DynamoDB left unprocessed."""
+    by_key = {(item["user_id"], item[SORT_KEY]): item for item in items}
+    unprocessed = []
+
+    for i in range(0, len(items), BATCH_WRITE_SIZE):
+        response = get_dynamodb_resource().batch_write_item(RequestItems={
+            CHAT_TABLE: [{"PutRequest": {"Item": item}} for item in items[i:i + BATCH_WRITE_SIZE]]
+        })
+        for request in response.get("UnprocessedItems", {}).get(CHAT_TABLE, []):
+            item = request["PutRequest"]["Item"]
+            unprocessed.append(by_key[(item["user_id"], item[SORT_KEY])])
+
+    return unprocessed
+
+write_buffer = WriteBehindBuffer(
+    "ChatWrite",
+    _write_items,
+    on_written=_update_threads,
+    max_size=CHAT_WRITE_BUFFER_SIZE
+)
+
+def store_message(user_id: str, chat_id: str, role: str, message: str, sources: list[str]):
+    _put_item(_build_item(user_id, chat_id, role, message, sources))
+
+class ChatExchange:
+    """One user question and its answer.
+
+    In write-behind mode the user turn is only staged (visible to reads in this process) until
+    complete() queues both turns for a single batched write; otherwise each turn is written inline.
+    """
+
+    def __init__(self, user_id: str, chat_id: str, question: str):
+        self.key = (user_id, chat_id)
+        self.user_item = _build_item(user_id, chat_id, "user", question, [])
+        self.completed = False
+
+        if CHAT_WRITE_MODE == "write_behind":
+            write_buffer.stage(self.key, [self.user_item])
+        else:
+            _put_item(self.user_item)
+
+    def complete(self, answer: str = None, sources: list[str] = None):
+        """Persist the exchange; called without an answer when the LLM call failed."""
+        if self.completed:
+            return
+        self.completed = True
+
+        items = []
+        if answer is not None:
+            items.append(_build_item(*self.key, "assistant", answer, sources or []))
+
+        if CHAT_WRITE_MODE != "write_behind":
+            for item in items:
+                _put_item(item)
+            return
+
+        items.insert(0, self.user_item)
+        if not write_buffer.submit(self.key, items):
+            for item in items:
+                _put_item(item)
+
+def _merge_pending(user_id: str, chat_id: str, items: list[dict]) -> list[dict]:
+    pending = write_buffer.pending((user_id, chat_id))
+    if not pending:
+        return items
+
+    keys = {item[SORT_KEY] for item in items}
+    merged = items + [item for item in pending if item[SORT_KEY] not in keys]
+    return sorted(merged, key=lambda x: x["time_stamp"])
+
+def iter_chat_history(user_id: str, chat_id: str):
+    pending = {item[SORT_KEY]: item for item in write_buffer.pending((user_id, chat_id))}
+
+    for item in _iter_query(**_chat_query(user_id, chat_id), ScanIndexForward=True):
+        pending.pop(item[SORT_KEY], None)
+        yield item
+
+    yield from sorted(pending.values(), key=lambda x: x["time_stamp"])
 
 def get_chat_history(user_id: str, chat_id: str):
-    response = chat_table.query(
-        KeyConditionExpression=Key("user_id").eq(user_id),
-        FilterExpression=Attr("chat_id").eq(chat_id),
-        ScanIndexForward=True
-    )
-    return response.get("Items", [])
+    return list(iter_chat_history(user_id, chat_id))
+
+def get_chat_history_page(user_id: str, chat_id: str, limit: int = None, cursor: str = None):
+    items, next_cursor = _query_page(user_id, ("user_id", SORT_KEY), limit, cursor, **_chat_query(user_id, chat_id), ScanIndexForward=True)
+    if next_cursor is None:
+        items = _merge_pending(user_id, chat_id, items)
+    return items, next_cursor
+
+def _thread_summary(item: dict) -> dict:
+    return {
+        "chat_id": item["chat_id"],
+        "last_used": item["last_used"],
+        "title": item.get("title", ""),
+        "message_count": int(item.get("message_count", 0))
+    }
+
+def _thread_query(user_id: str) -> dict:
+    return {
+        "KeyConditionExpression": Key("user_id").eq(user_id) & Key("chat_key").begins_with(THREAD_PREFIX),
+        "ProjectionExpression": "chat_id, last_used, title, message_count"
+    }
 
 def list_chats(user_id: str):
-    response = chat_table.query(
+    if CHAT_SCHEMA == "composite":
+        chats = [_thread_summary(item) for item in _iter_query(**_thread_query(user_id))]
+        return sorted(chats, key=lambda x: x["last_used"], reverse=True)
+
+    items = _iter_query(
         KeyConditionExpression=Key("user_id").eq(user_id),
         ProjectionExpression="chat_id, time_stamp",
         ScanIndexForward=False
@@ -37,7 +258,7 @@ def list_chats(user_id: str):
     seen = set()
     chats = []
 
-    for item in response.get("Items", []):
+    for item in items:
         cid = item["chat_id"]
         if cid not in seen:
             seen.add(cid)
@@ -48,61 +269,108 @@ def list_chats(user_id: str):
 
     return sorted(chats, key=lambda x: x["last_used"], reverse=True)
 
-def delete_chat(user_id: str, chat_id: str):
-    response = chat_table.query(
+def list_chats_page(user_id: str, limit: int = None, cursor: str = None):
+    """Pages walk the threads index newest first, so the first page holds the most recently used chats.
+
+    Legacy tables return a single page.
+    """
+    if CHAT_SCHEMA != "composite":
+        return list_chats(user_id), None
+
+    items, next_cursor = _query_page(
+        user_id,
+        ("user_id", "chat_key", "last_used"),
+        limit,
+        cursor,
+        IndexName=THREADS_INDEX,
         KeyConditionExpression=Key("user_id").eq(user_id),
-        FilterExpression=Attr("chat_id").eq(chat_id),
-        ProjectionExpression="user_id, time_stamp"
+        ProjectionExpression="chat_id, last_used, title, message_count",
+        ScanIndexForward=False
     )
+    return [_thread_summary(item) for item in items], next_cursor
 
-    items = response.get("Items", [])
-    if not items:
-        return False
-
+def _delete_chunk(keys: list[dict]) -> int:
     with chat_table.batch_writer() as batch:
-        for item in items:
-            batch.delete_item(
-                Key={
-                    "user_id": item["user_id"],
-                    "time_stamp": item["time_stamp"]
-                }
-            )
-
-    return True
-
-def delete_all_chats(user_id: str):
-    response = chat_table.query(
-        KeyConditionExpression=Key("user_id").eq(user_id),
-        ProjectionExpression="user_id, time_stamp"
+        for key in keys:
+            batch.delete_item(Key=key)
+    return len(keys)
+
+def _delete_keys(keys, progress=None) -> int:
+    """Delete keys in DELETE_CHUNK_SIZE chunks spread over DELETE_PARALLELISM batch writers."""
+    deleted = 0
+    futures = deque()
+
+    def collect(future):
+        count = future.result()
+        if progress is not None:
+            progress(count)
+        return count
+
+    with ThreadPoolExecutor(max_workers=DELETE_PARALLELISM) as executor:
+        chunk = []
+
+        for key in keys:
+            chunk.append(key)
+            if len(chunk) == DELETE_CHUNK_SIZE:
+                futures.append(executor.submit(_delete_chunk, chunk))
+                chunk = []
+                # Keep at most two chunks per writer in flight so large partitions are not buffered in memory.
+                if len(futures) >= DELETE_PARALLELISM * 2:
+                    deleted += collect(futures.popleft())
+        if chunk:
+            futures.append(executor.submit(_delete_chunk, chunk))
+
+        while futures:
+            deleted += collect(futures.popleft())
+
+    return deleted
+
+def _flush_pending(match, description: str):
+    # Otherwise a write still sitting in the write-behind queue lands after the delete and resurrects the chat.
+    if CHAT_WRITE_MODE == "write_behind" and not write_buffer.flush(match, timeout=DELETE_FLUSH_TIMEOUT):
+        logger.warning(f"[DELETE CHAT] Buffered writes for {description} not flushed after {DELETE_FLUSH_TIMEOUT}s; deleting anyway")
+
+def delete_chat(user_id: str, chat_id: str, progress=None) -> int:
+    """Delete every message in a chat (all query pages) and its summary; returns the number of messages deleted."""
+    _flush_pending(lambda key: key == (user_id, chat_id), f"chat {chat_id}")
+    items = _iter_query(
+        **_chat_query(user_id, chat_id),
+        ProjectionExpression=f"user_id, {SORT_KEY}"
     )
 
-    items = response.get("Items", [])
-    if not items:
-        return False
+    deleted = _delete_keys((_item_key(item) for item in items), progress=progress)
 
-    with chat_table.batch_writer() as batch:
-        for item in items:
-            batch.delete_item(
-                Key={
-                    "user_id": item["user_id"],
-                    "time_stamp": item["time_stamp"]
-                }
-            )
+    if deleted and CHAT_SCHEMA == "composite":
+        chat_table.delete_item(Key=_thread_key(user_id, chat_id))
 
-    return True
+    return deleted
 
-def get_recent_chat_history(user_id: str, chat_id: str, limit: int = 4):
-    response = chat_table.query(
+def delete_all_chats(user_id: str, progress=None) -> int:
+    """Delete every item in the user's partition, thread summaries included; returns the number deleted."""
+    _flush_pending(lambda key: key[0] == user_id, f"user {user_id}")
+    items = _iter_query(
         KeyConditionExpression=Key("user_id").eq(user_id),
-        FilterExpression=Attr("chat_id").eq(chat_id),
-        ScanIndexForward=False, 
-        Limit=limit
+        ProjectionExpression=f"user_id, {SORT_KEY}"
     )
-    items = response.get("Items", [])
-    items = sorted(items, key=lambda x: x["time_stamp"], reverse=True)
-    items = list(reversed(items))
+
+    return _delete_keys((_item_key(item) for item in items), progress=progress)
+
+def get_recent_chat_history(user_id: str, chat_id: str, limit: int = 4):
+    query = _chat_query(user_id, chat_id)
+
+    with span("history"):
+        if CHAT_SCHEMA == "composite":
+            items = chat_table.query(**query, ScanIndexForward=False, Limit=limit).get("Items", [])
+        else:
+            # Limit applies before the chat_id filter, so read small pages newest first until enough turns match.
+            items = list(islice(
+                _iter_query(**query, ScanIndexForward=False, Limit=HISTORY_PAGE_SIZE, max_pages=HISTORY_MAX_PAGES),
+                limit
+            ))
+    items = _merge_pending(user_id, chat_id, items)
+    items = sorted(items, key=lambda x: x["time_stamp"])[-limit:]
     chat_history = [
         {"role": item["role"], "content": item["message"]}
         for item in items
     ]
-    return chat_history
\ No newline at end of file
+    return chat_history
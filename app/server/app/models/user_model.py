@@ -1,45 +1,107 @@
-import bcrypt
 from datetime import datetime, timezone
-from app.dynamo_utils import get_dynamodb_resource
+from functools import lru_cache
+from app.dynamo_utils import get_dynamodb_resource, get_dynamodb_table
+from app.utils import password_hasher
 from instance.config import get_env_variable
+from app.utils.cloudwatch_utils import get_logger, publish_metric
 
 USERS_TABLE = get_env_variable("DYNAMODB_USERS_TABLE")
+# Each user has a companion "email#<email>" item in the users table mapping the address to its user_id.
+EMAIL_KEY_PREFIX = "email#"
+EMAIL_CACHE_SIZE = int(get_env_variable("USER_EMAIL_CACHE_SIZE", default=10000))
 
-dynamodb = get_dynamodb_resource()
-users_table = dynamodb.Table(USERS_TABLE)
+users_table = get_dynamodb_table(USERS_TABLE)
+logger = get_logger()
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return password_hasher.hash_password(password)
 
 def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    return password_hasher.verify_password(password, hashed)
 
-def user_exists(user_id: str) -> bool:
-    response = users_table.get_item(Key={'user_id': user_id})
-    return 'Item' in response
+def rehash_password_if_needed(user_id: str, password: str, hashed: str):
+    """Re-hash at the configured BCRYPT_ROUNDS in the background when the stored cost differs."""
+    if not password_hasher.needs_rehash(hashed):
+        return
 
-def create_user(user_id: str, name: str, email: str, password: str) -> bool:
-    if user_exists(user_id):
-        return False
+    def store(future):
+        try:
+            users_table.update_item(
+                Key={'user_id': user_id},
+                UpdateExpression='SET password_hash = :new',
+                ConditionExpression='password_hash = :old',
+                ExpressionAttributeValues={':new': future.result().decode('utf-8'), ':old': hashed}
+            )
+            publish_metric("PasswordsRehashed", 1)
+        except Exception as e:
+            logger.warning(f"[AUTH] Failed to rehash password for user {user_id}: {str(e)}")
+
+    try:
+        password_hasher.hash_password_async(password).add_done_callback(store)
+    except password_hasher.PasswordHasherBusy:
+        pass
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def email_key(email: str) -> str:
+    return f"{EMAIL_KEY_PREFIX}{normalize_email(email)}"
 
+def create_user(user_id: str, name: str, email: str, password: str) -> bool:
     hashed_pw = hash_password(password)
-    users_table.put_item(Item={
-        'user_id': user_id,
-        'name': name,
-        'email': email,
-        'password_hash': hashed_pw,
-        'created_at': datetime.now(timezone.utc).isoformat()
-    })
+    # The resource's client serializes plain Python values, the same as Table.put_item does.
+    client = get_dynamodb_resource().meta.client
+
+    try:
+        client.transact_write_items(TransactItems=[
+            {
+                'Put': {
+                    'TableName': USERS_TABLE,
+                    'Item': {'user_id': email_key(email), 'owner_id': user_id},
+                    'ConditionExpression': 'attribute_not_exists(user_id)'
+                }
+            },
+            {
+                'Put': {
+                    'TableName': USERS_TABLE,
+                    'Item': {
+                        'user_id': user_id,
+                        'name': name,
+                        'email': email,
+                        'password_hash': hashed_pw,
+                        'created_at': datetime.now(timezone.utc).isoformat()
+                    },
+                    'ConditionExpression': 'attribute_not_exists(user_id)'
+                }
+            }
+        ])
+    except client.exceptions.TransactionCanceledException as e:
+        # Only a failed attribute_not_exists condition means the email or user_id is taken; transaction
+        # conflicts and throttling are transient and must not be reported to the caller as a duplicate.
+        reasons = e.response.get('CancellationReasons', [])
+        if any(reason.get('Code') == 'ConditionalCheckFailed' for reason in reasons):
+            return False
+        raise
+
     return True
 
 def get_user(user_id: str):
     response = users_table.get_item(Key={'user_id': user_id})
     return response.get('Item')
 
+@lru_cache(maxsize=EMAIL_CACHE_SIZE)
+def _lookup_user_id(normalized_email: str) -> str:
+    # Email-to-user_id mappings never change once written, so found ids are safe to cache.
+    # Misses raise instead of returning None so that lru_cache does not remember them.
+    response = users_table.get_item(Key={'user_id': f"{EMAIL_KEY_PREFIX}{normalized_email}"})
+    item = response.get('Item')
+    if not item:
+        raise LookupError(normalized_email)
+    return item['owner_id']
+
 def get_user_by_email(email: str):
-    response = users_table.scan(
-        FilterExpression='email = :email',
-        ExpressionAttributeValues={':email': email}
-    )
-    items = response.get('Items', [])
-    return items[0] if items else None
\ No newline at end of file
+    try:
+        user_id = _lookup_user_id(normalize_email(email))
+    except LookupError:
+        return None
+    return get_user(user_id)
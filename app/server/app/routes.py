@@ -1,44 +1,188 @@
-from flask import Blueprint, request, jsonify
+import json
+import time
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.chat_model import store_message, get_chat_history, list_chats, delete_chat, delete_all_chats, get_recent_chat_history
-from app.utils.query_api import get_ai_answer
+from app.models.chat_model import ChatExchange, get_chat_history, get_chat_history_page, iter_chat_history, list_chats, list_chats_page, delete_chat, delete_all_chats, get_recent_chat_history
+from app.utils.query_api import QUERY_OPERATION, get_ai_answer, stream_ai_answer, query_client
+from app.utils.http_client import CircuitOpenError
+from app.utils.admission import admission_control
+from app.utils.background_jobs import JobRegistry
+from app.utils.health_probe import HealthProber
+from app.utils.tracing import current_trace, get_request_id
 from app.dynamo_utils import get_dynamodb_resource
 from instance.config import get_env_variable
 from app.utils.cloudwatch_utils import get_logger, publish_metric
-import boto3
 
 bp = Blueprint("routes", __name__)
 logger = get_logger()
 
+MAX_PAGE_SIZE = int(get_env_variable("MAX_PAGE_SIZE", default=100))
+
+def table_check(table_name):
+    return lambda: get_dynamodb_resource().meta.client.describe_table(TableName=table_name)
+
+health_prober = HealthProber({
+    "users_table": table_check(get_env_variable("DYNAMODB_USERS_TABLE")),
+    "chat_table": table_check(get_env_variable("DYNAMODB_CHAT_TABLE")),
+    "articles_table": table_check(get_env_variable("DYNAMODB_ARTICLES_TABLE"))
+}, "HealthChecks")
+
+delete_jobs = JobRegistry("ChatDelete", max_workers=int(get_env_variable("CHAT_DELETE_JOB_WORKERS", default=2)))
+
+# Deletion metrics are published when the job finishes, not when it is queued, and only if it removed something.
+def delete_chat_job(user_id, chat_id, progress=None):
+    deleted = delete_chat(user_id, chat_id, progress=progress)
+    if deleted > 0:
+        publish_metric("ChatsDeleted", 1)
+    return deleted
+
+def delete_all_chats_job(user_id, progress=None):
+    deleted = delete_all_chats(user_id, progress=progress)
+    if deleted > 0:
+        publish_metric("AllChatsDeleted", 1)
+    return deleted
+
+def get_page_args():
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+
+    if limit is not None:
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        limit = min(limit, MAX_PAGE_SIZE)
+
+    return limit, cursor
+
+def get_search_args(data):
+    """Search options /chat forwards to the query service, which validates their contents."""
+    search = {field: data[field] for field in ("filters", "alpha") if data.get(field) is not None}
+
+    if "filters" in search and not isinstance(search["filters"], dict):
+        raise ValueError("'filters' must be an object")
+    alpha = search.get("alpha", 0)
+    if isinstance(alpha, bool) or not isinstance(alpha, (int, float)) or not 0 <= alpha <= 1:
+        raise ValueError("'alpha' must be a number between 0 and 1")
+
+    return search
+
+def stream_chat(exchange, user_id, question, k, chat_history, search):
+    start_time = time.time()
+    tokens = []
+    sources = []
+    first_token = True
+
+    events = stream_ai_answer(question, k, chat_history=chat_history, search=search)
+
+    try:
+        for event in events:
+            event_type = event.get("type")
+
+            if event_type == "token":
+                if first_token:
+                    first_token = False
+                    publish_metric("ChatTimeToFirstTokenMs", (time.time() - start_time) * 1000, unit="Milliseconds")
+                tokens.append(event.get("content", ""))
+            elif event_type == "sources":
+                sources = event.get("sources", [])
+            elif event_type == "error":
+                raise RuntimeError(event.get("error", "Query service stream failed"))
+            elif event_type == "done":
+                break
+
+            yield json.dumps(event) + "\n"
+
+        exchange.complete("".join(tokens), sources)
+
+        publish_metric("ChatsCreated", 1)
+        # The Server-Timing header only covers the stages before the stream started.
+        trace = current_trace()
+        yield json.dumps({"type": "done", "timings": trace.timings() if trace else {}}) + "\n"
+
+    except GeneratorExit:
+        # The client went away mid-stream; keep the part of the answer it already received.
+        if not exchange.completed:
+            if tokens:
+                exchange.complete("".join(tokens), sources)
+            else:
+                exchange.complete()
+            logger.info(f"[CHAT] Request {get_request_id()} stream closed by client for user {user_id} after {len(tokens)} tokens")
+            publish_metric("ChatStreamsAborted", 1)
+        raise
+
+    except Exception as e:
+        exchange.complete()
+        logger.error(f"[CHAT] Request {get_request_id()} stream failed for user {user_id}: {str(e)}", exc_info=True)
+        publish_metric("ChatErrors", 1)
+        yield json.dumps({"type": "error", "error": "Failed to process chat"}) + "\n"
+
+    finally:
+        # Release the upstream connection now rather than when the inner generator is collected.
+        events.close()
+
+
 # === CHAT ===
 @bp.route("/chat", methods=["POST"])
 @jwt_required()
+@admission_control
 def chat():
     data = request.get_json()
     question = data.get("message")
     k = int(data.get("num_sources", 3))
     chat_id = data.get("chat_id")
+    stream = bool(data.get("stream", False))
 
     if not question or not chat_id:
         logger.warning("Missing 'message' or 'chat_id' in /chat request")
         return jsonify({"error": "Both 'message' and 'chat_id' are required"}), 400
 
+    try:
+        search = get_search_args(data)
+    except ValueError as e:
+        logger.warning(f"Invalid search options in /chat request: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
     user_id = get_jwt_identity()
+    exchange = None
 
     try:
-        logger.info(f"[CHAT] User {user_id} asked: {question} in chat_id: {chat_id}")
-        store_message(user_id, chat_id, "user", question, [])
+        # Once a stream has started its status is 200, so an open circuit has to be caught up front.
+        if stream and query_client.breaker(QUERY_OPERATION).is_open:
+            raise CircuitOpenError("Query service circuit is open")
+
+        logger.info(f"[CHAT] Request {get_request_id()}: user {user_id} asked: {question} in chat_id: {chat_id}")
+        exchange = ChatExchange(user_id, chat_id, question)
 
         chat_history = get_recent_chat_history(user_id, chat_id, limit=4) or []
-        answer, sources = get_ai_answer(question, k, chat_history=chat_history)
 
-        store_message(user_id, chat_id, "assistant", answer, sources)
+        if stream:
+            response = Response(
+                stream_with_context(stream_chat(exchange, user_id, question, k, chat_history, search)),
+                mimetype="application/x-ndjson",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+            # complete() is idempotent; this covers a client that disconnects before the stream starts.
+            response.call_on_close(exchange.complete)
+            return response
+
+        answer, sources = get_ai_answer(question, k, chat_history=chat_history, search=search)
+
+        exchange.complete(answer, sources)
 
         publish_metric("ChatsCreated", 1)
         return jsonify({"response": answer, "sources": sources}), 200
 
+    except CircuitOpenError:
+        if exchange is not None:
+            exchange.complete()
+        logger.warning(f"[CHAT] Query service circuit open, rejecting chat for user {user_id}")
+        publish_metric("ChatErrors", 1)
+        retry_after = str(query_client.breaker(QUERY_OPERATION).retry_after)
+        return jsonify({"error": "Answer service temporarily unavailable"}), 503, {"Retry-After": retry_after}
     except Exception as e:
-        logger.error(f"[CHAT] Error for user {user_id}: {str(e)}", exc_info=True)
+        if exchange is not None:
+            exchange.complete()
+        logger.error(f"[CHAT] Request {get_request_id()} failed for user {user_id}: {str(e)}", exc_info=True)
         publish_metric("ChatErrors", 1)
         return jsonify({"error": "Failed to process chat"}), 500
 
@@ -55,11 +199,31 @@ def chat_history():
         return jsonify({"error": "Missing chat_id in query params"}), 400
 
     try:
-        history = get_chat_history(user_id, chat_id)
+        limit, cursor = get_page_args()
+    except ValueError:
+        logger.warning("Invalid 'limit' in /chat-history request")
+        return jsonify({"error": "limit must be a positive integer"}), 400
+
+    try:
+        if request.args.get("format") == "ndjson":
+            publish_metric("ChatHistoryExported", 1)
+            return Response(
+                stream_with_context(json.dumps(item) + "\n" for item in iter_chat_history(user_id, chat_id)),
+                mimetype="application/x-ndjson"
+            )
+
+        if limit or cursor:
+            history, next_cursor = get_chat_history_page(user_id, chat_id, limit=limit, cursor=cursor)
+        else:
+            history, next_cursor = get_chat_history(user_id, chat_id), None
+
         logger.info(f"[CHAT HISTORY] Returned {len(history)} messages for user {user_id}")
         publish_metric("ChatHistoryViewed", 1)
-        return jsonify({"history": history}), 200
+        return jsonify({"history": history, "next_cursor": next_cursor}), 200
 
+    except ValueError:
+        logger.warning(f"[CHAT HISTORY] Invalid cursor for user {user_id}")
+        return jsonify({"error": "Invalid cursor"}), 400
     except Exception as e:
         logger.error(f"[CHAT HISTORY] Error for user {user_id}: {str(e)}", exc_info=True)
         publish_metric("ChatHistoryErrors", 1)
@@ -73,11 +237,24 @@ def list_chat_threads():
     user_id = get_jwt_identity()
 
     try:
-        threads = list_chats(user_id)
+        limit, cursor = get_page_args()
+    except ValueError:
+        logger.warning("Invalid 'limit' in /chats request")
+        return jsonify({"error": "limit must be a positive integer"}), 400
+
+    try:
+        if limit or cursor:
+            threads, next_cursor = list_chats_page(user_id, limit=limit, cursor=cursor)
+        else:
+            threads, next_cursor = list_chats(user_id), None
+
         logger.info(f"[LIST CHATS] User {user_id} has {len(threads)} threads")
         publish_metric("ChatThreadsListed", 1)
-        return jsonify({"chats": threads}), 200
+        return jsonify({"chats": threads, "next_cursor": next_cursor}), 200
 
+    except ValueError:
+        logger.warning(f"[LIST CHATS] Invalid cursor for user {user_id}")
+        return jsonify({"error": "Invalid cursor"}), 400
     except Exception as e:
         logger.error(f"[LIST CHATS] Error for user {user_id}: {str(e)}", exc_info=True)
         publish_metric("ChatListErrors", 1)
@@ -96,14 +273,9 @@ def delete_user_chat():
         return jsonify({"error": "Missing chat_id in query params"}), 400
 
     try:
-        deleted = delete_chat(user_id, chat_id)
-        if deleted:
-            logger.info(f"[DELETE CHAT] Deleted chat {chat_id} for user {user_id}")
-            publish_metric("ChatsDeleted", 1)
-            return jsonify({"message": "Chat deleted"}), 200
-        else:
-            logger.info(f"[DELETE CHAT] No chat {chat_id} found for user {user_id}")
-            return jsonify({"message": "No chat found"}), 404
+        job = delete_jobs.submit(user_id, "delete-chat", delete_chat_job, user_id, chat_id)
+        logger.info(f"[DELETE CHAT] Queued deletion of chat {chat_id} for user {user_id} as job {job['job_id']}")
+        return jsonify({"message": "Chat deletion started", "job": job}), 202
 
     except Exception as e:
         logger.error(f"[DELETE CHAT] Error: {str(e)}", exc_info=True)
@@ -118,14 +290,9 @@ def delete_all_user_chats():
     user_id = get_jwt_identity()
 
     try:
-        deleted = delete_all_chats(user_id)
-        if deleted:
-            logger.info(f"[DELETE ALL] Deleted all chats for user {user_id}")
-            publish_metric("AllChatsDeleted", 1)
-            return jsonify({"message": "All chats deleted"}), 200
-        else:
-            logger.info(f"[DELETE ALL] No chats found for user {user_id}")
-            return jsonify({"message": "No chats found"}), 404
+        job = delete_jobs.submit(user_id, "delete-all-chats", delete_all_chats_job, user_id)
+        logger.info(f"[DELETE ALL] Queued deletion of all chats for user {user_id} as job {job['job_id']}")
+        return jsonify({"message": "Deletion of all chats started", "job": job}), 202
 
     except Exception as e:
         logger.error(f"[DELETE ALL] Error: {str(e)}", exc_info=True)
@@ -133,33 +300,30 @@ def delete_all_user_chats():
         return jsonify({"error": "Failed to delete all chats"}), 500
 
 
+# === DELETE JOB STATUS ===
+@bp.route("/delete-jobs/<job_id>", methods=["GET"])
+@jwt_required()
+def delete_job_status(job_id):
+    user_id = get_jwt_identity()
+    job = delete_jobs.get(job_id)
+
+    if not job or job["user_id"] != user_id:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify({"job": job}), 200
+
+
 # === HEALTH CHECK ===
 @bp.route("/health", methods=["GET"])
 def health_check():
-    try:
-        dynamodb = get_dynamodb_resource()
+    snapshot = health_prober.snapshot()
+    return jsonify(snapshot), 200 if snapshot["status"] == "healthy" else 500
 
-        users_table = get_env_variable("DYNAMODB_USERS_TABLE")
-        chat_table = get_env_variable("DYNAMODB_CHAT_TABLE")
-        articles_table = get_env_variable("DYNAMODB_ARTICLES_TABLE")
-        
-        dynamodb.meta.client.describe_table(TableName=users_table)
-        dynamodb.meta.client.describe_table(TableName=chat_table)
-        dynamodb.meta.client.describe_table(TableName=articles_table)
 
-        logger.info("[HEALTH] All DynamoDB tables verified healthy")
-        publish_metric("HealthChecks", 1)
-
-        return jsonify({"status": "healthy"}), 200
-
-    except boto3.exceptions.Boto3Error as e:
-        logger.error(f"[HEALTH] Boto3Error: {str(e)}", exc_info=True)
-        publish_metric("HealthChecks", 0)
-        return jsonify({"status": "unhealthy", "error": str(e)}), 500
-    except Exception as e:
-        logger.error(f"[HEALTH] General Error: {str(e)}", exc_info=True)
-        publish_metric("HealthChecks", 0)
-        return jsonify({"status": "unhealthy", "error": str(e)}), 500
+# === LIVENESS ===
+@bp.route("/live", methods=["GET"])
+def liveness_check():
+    return jsonify({"status": "alive"}), 200
 
 
 # === HOME ===
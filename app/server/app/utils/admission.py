@@ -0,0 +1,185 @@
+import threading
+import time
+from functools import wraps
+from flask import jsonify, make_response
+from flask_jwt_extended import get_jwt_identity
+from instance.config import get_env_variable
+from app.utils.cloudwatch_utils import get_logger, publish_metric
+
+RATE_LIMIT_PER_MINUTE = float(get_env_variable("CHAT_RATE_LIMIT_PER_MINUTE", default=20))
+RATE_LIMIT_BURST = float(get_env_variable("CHAT_RATE_LIMIT_BURST", default=5))
+# "memory" keeps buckets per process; "dynamodb" shares them across workers through RATE_LIMIT_TABLE.
+RATE_LIMIT_BACKEND = get_env_variable("RATE_LIMIT_BACKEND", default="memory")
+CHAT_MAX_CONCURRENCY = int(get_env_variable("CHAT_MAX_CONCURRENCY", default=16))
+CHAT_USER_MAX_CONCURRENCY = int(get_env_variable("CHAT_USER_MAX_CONCURRENCY", default=2))
+CHAT_MAX_QUEUE = int(get_env_variable("CHAT_MAX_QUEUE", default=8))
+CHAT_QUEUE_TIMEOUT = float(get_env_variable("CHAT_QUEUE_TIMEOUT", default=2))
+
+logger = get_logger()
+
+
+def refill(tokens, updated_at, now, rate, capacity):
+    return min(capacity, tokens + (now - updated_at) * rate)
+
+
+class InMemoryTokenBucketStore:
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity):
+        """Take one token; returns (allowed, seconds until a token is available)."""
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = refill(tokens, updated_at, now, rate, capacity)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return False, (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1, now)
+            return True, 0
+
+
+class DynamoDBTokenBucketStore:
+    """Token buckets stored as items keyed on "bucket_key", updated with optimistic concurrency."""
+
+    def __init__(self, table, max_attempts=3):
+        self.table = table
+        self.max_attempts = max_attempts
+
+    def take(self, key, rate, capacity):
+        for _ in range(self.max_attempts):
+            now = time.time()
+            item = self.table.get_item(Key={"bucket_key": key}, ConsistentRead=True).get("Item")
+
+            if item:
+                tokens = refill(float(item["tokens"]), float(item["updated_at"]), now, rate, capacity)
+                condition = "updated_at = :previous"
+                values = {":previous": item["updated_at"]}
+            else:
+                tokens = capacity
+                condition = "attribute_not_exists(bucket_key)"
+                values = {}
+
+            allowed = tokens >= 1
+            values.update({
+                ":tokens": str(tokens - 1 if allowed else tokens),
+                ":now": str(now),
+                ":expires": int(now + capacity / rate) + 60
+            })
+
+            try:
+                self.table.update_item(
+                    Key={"bucket_key": key},
+                    UpdateExpression="SET tokens = :tokens, updated_at = :now, expires_at = :expires",
+                    ConditionExpression=condition,
+                    ExpressionAttributeValues=values
+                )
+            except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+                continue
+
+            return (True, 0) if allowed else (False, (1 - tokens) / rate)
+
+        return False, 1 / rate
+
+
+def create_token_bucket_store():
+    if RATE_LIMIT_BACKEND == "dynamodb":
+        from app.dynamo_utils import get_dynamodb_table
+        return DynamoDBTokenBucketStore(get_dynamodb_table(get_env_variable("RATE_LIMIT_TABLE")))
+    return InMemoryTokenBucketStore()
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight requests per instance and per user; callers beyond the instance cap wait in a short, bounded queue."""
+
+    def __init__(self, max_concurrency, per_user, max_queue, queue_timeout):
+        self.per_user = per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._per_user = {}
+
+    def acquire(self, user_id) -> bool:
+        with self._lock:
+            if self._per_user.get(user_id, 0) >= self.per_user:
+                return False
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+            if self._slots.acquire(blocking=False):
+                return True
+            if self._waiting >= self.max_queue:
+                self._unreserve(user_id)
+                return False
+            self._waiting += 1
+
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+
+        with self._lock:
+            self._waiting -= 1
+            if not acquired:
+                self._unreserve(user_id)
+        return acquired
+
+    def _unreserve(self, user_id):
+        remaining = self._per_user.get(user_id, 1) - 1
+        if remaining > 0:
+            self._per_user[user_id] = remaining
+        else:
+            self._per_user.pop(user_id, None)
+
+    def release(self, user_id):
+        with self._lock:
+            self._unreserve(user_id)
+        self._slots.release()
+
+
+token_buckets = create_token_bucket_store()
+chat_concurrency = ConcurrencyLimiter(CHAT_MAX_CONCURRENCY, CHAT_USER_MAX_CONCURRENCY, CHAT_MAX_QUEUE, CHAT_QUEUE_TIMEOUT)
+
+
+def reject(reason, retry_after):
+    publish_metric("ChatRequestsRejected", 1)
+    publish_metric(f"ChatRejected{reason}", 1)
+    response = jsonify({"error": "Too many requests, please retry later"})
+    response.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+    return response, 429
+
+
+def admission_control(fn):
+    """Apply the per-user token bucket and the concurrency limits; must run after @jwt_required()."""
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        user_id = get_jwt_identity()
+
+        try:
+            allowed, retry_after = token_buckets.take(f"chat:{user_id}", RATE_LIMIT_PER_MINUTE / 60, RATE_LIMIT_BURST)
+        except Exception as e:
+            # Fail open: a rate-limit backend outage should not take /chat down with it.
+            logger.warning(f"[ADMISSION] Rate limit backend error: {str(e)}")
+            allowed, retry_after = True, 0
+
+        if not allowed:
+            logger.info(f"[ADMISSION] Rate limited user {user_id}")
+            return reject("RateLimit", retry_after)
+
+        if not chat_concurrency.acquire(user_id):
+            logger.info(f"[ADMISSION] Concurrency limit reached for user {user_id}")
+            return reject("Concurrency", 1)
+
+        try:
+            response = make_response(fn(*args, **kwargs))
+        except Exception:
+            chat_concurrency.release(user_id)
+            raise
+
+        if response.is_streamed:
+            # Hold the slot until the client has consumed the whole stream.
+            response.call_on_close(lambda: chat_concurrency.release(user_id))
+        else:
+            chat_concurrency.release(user_id)
+        return response
+
+    return wrapper
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import math
+import operator
+import threading
+import time
+from collections import OrderedDict
+from app.utils.cloudwatch_utils import publish_metric
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def context_key(question: str, chat_history, num_sources: int, search=None) -> str:
+    """Hash of everything besides the question that shapes the answer.
+
+    /chat stores the question before reading recent history, so a trailing user turn equal to the
+    question is dropped; otherwise every first question would get its own context.
+    """
+    history = list(chat_history or [])
+    if history and history[-1].get("role") == "user" and history[-1].get("content") == question:
+        history = history[:-1]
+
+    payload = json.dumps({"history": history, "num_sources": num_sources, "search": search or {}}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def unit_vector(vector):
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else None
+
+
+class SemanticAnswerCache:
+    """TTL + LRU cache of (answer, sources) keyed on question, history hash and num_sources.
+
+    Lookups try the normalized question text first and then the closest cached question embedding
+    in the same context whose cosine similarity is at least the threshold.
+    """
+
+    def __init__(self, max_entries=1000, ttl_seconds=300, threshold=0.95):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by clear(); answers computed before an invalidation are not stored afterwards.
+        self.generation = 0
+
+    def get_exact(self, question, context):
+        start_time = time.time()
+        key = (context, normalize_question(question))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["expires"] > time.time():
+                self._entries.move_to_end(key)
+                return self._hit("exact", entry, start_time)
+            if entry:
+                del self._entries[key]
+
+        return None
+
+    def get_similar(self, context, embedding):
+        start_time = time.time()
+        query = unit_vector(embedding)
+        if query is None:
+            return None
+
+        now = time.time()
+        best_key, best_score = None, self.threshold
+
+        # Candidates are copied under the lock and scored outside it, so a large cache does not block other lookups.
+        with self._lock:
+            candidates = [
+                (key, entry["embedding"]) for key, entry in self._entries.items()
+                if key[0] == context and entry["expires"] > now and entry["embedding"] is not None
+            ]
+
+        for key, embedding in candidates:
+            score = sum(map(operator.mul, query, embedding))
+            if score >= best_score:
+                best_key, best_score = key, score
+
+        if best_key is not None:
+            with self._lock:
+                entry = self._entries.get(best_key)
+                if entry is not None:
+                    self._entries.move_to_end(best_key)
+                    return self._hit("semantic", entry, start_time)
+
+        publish_metric("AnswerCacheMisses", 1)
+        return None
+
+    def put(self, question, context, embedding, answer, sources, generation=None):
+        key = (context, normalize_question(question))
+        entry = {
+            "answer": answer,
+            "sources": sources,
+            "embedding": unit_vector(embedding) if embedding else None,
+            "expires": time.time() + self.ttl_seconds
+        }
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                publish_metric("AnswerCacheEvictions", 1)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def _hit(self, kind, entry, start_time):
+        publish_metric("AnswerCacheHits", 1)
+        publish_metric(f"AnswerCache{kind.capitalize()}Hits", 1)
+        publish_metric("AnswerCacheLookupMs", (time.time() - start_time) * 1000, unit="Milliseconds")
+        return entry["answer"], entry["sources"]
@@ -0,0 +1,82 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from app.utils.cloudwatch_utils import get_logger, publish_metric
+
+logger = get_logger()
+
+
+class JobRegistry:
+    """Runs long operations off the request thread and tracks their progress in-process.
+
+    Job state lives only in the worker that queued the job, so status lookups must reach that worker:
+    run a single worker per instance, or pin clients to one (sticky sessions). Jobs are lost on restart.
+
+    Job functions receive a progress(count) callback as the keyword argument "progress" and return a result count.
+    """
+
+    def __init__(self, name, max_workers=2, retention_seconds=3600):
+        self.name = name
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"promptwire-{name}")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, user_id, kind, fn, *args) -> dict:
+        self._prune()
+        job_id = str(uuid.uuid4())
+
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "user_id": user_id,
+                "kind": kind,
+                "status": "queued",
+                "processed": 0,
+                "result": None,
+                "error": None,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "finished_at": None,
+                "_finished": None
+            }
+
+        self._executor.submit(self._run, job_id, fn, *args)
+        return self.get(job_id)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return {k: v for k, v in job.items() if not k.startswith("_")} if job else None
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _run(self, job_id, fn, *args):
+        start_time = time.time()
+        self._update(job_id, status="running")
+
+        def progress(count):
+            with self._lock:
+                self._jobs[job_id]["processed"] += count
+
+        try:
+            result = fn(*args, progress=progress)
+            self._update(job_id, status="completed", result=result)
+            publish_metric(f"{self.name}JobsCompleted", 1)
+        except Exception as e:
+            logger.error(f"[JOBS] {self.name} job {job_id} failed: {str(e)}", exc_info=True)
+            self._update(job_id, status="failed", error=str(e))
+            publish_metric(f"{self.name}JobsFailed", 1)
+        finally:
+            self._update(job_id, finished_at=datetime.now(timezone.utc).isoformat(), _finished=time.time())
+            publish_metric(f"{self.name}JobLatencyMs", (time.time() - start_time) * 1000, unit="Milliseconds")
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if job["_finished"] and job["_finished"] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
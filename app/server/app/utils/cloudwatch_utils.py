@@ -1,46 +1,308 @@
-import boto3
+import atexit
+import os
+import threading
 import watchtower
 import logging
+import logging.handlers
+import queue
+from datetime import datetime, timezone
 from instance.config import get_env_variable
+from app.aws_clients import get_client
+
+LOG_QUEUE_SIZE = int(get_env_variable("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(get_env_variable("LOG_BATCH_SIZE", "500"))
+LOG_FLUSH_INTERVAL = float(get_env_variable("LOG_FLUSH_INTERVAL", "5"))
+# "drop_newest" discards the incoming record when the queue is full, "drop_oldest" evicts the oldest queued one.
+LOG_OVERFLOW_POLICY = get_env_variable("LOG_OVERFLOW_POLICY", "drop_newest")
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records without ever blocking the caller, counting whatever the bounded queue cannot hold."""
+
+    def __init__(self, log_queue, overflow_policy=LOG_OVERFLOW_POLICY):
+        super().__init__(log_queue)
+        self.overflow_policy = overflow_policy
+        self.listener = None
+        self.dropped_records = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record):
+        if self.listener is not None:
+            self.listener.ensure_started()
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+
+        if self.overflow_policy == "drop_oldest":
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(record)
+            except (queue.Empty, queue.Full):
+                pass
+
+        with self._dropped_lock:
+            self.dropped_records += 1
+
+    def take_dropped(self):
+        with self._dropped_lock:
+            dropped, self.dropped_records = self.dropped_records, 0
+        return dropped
+
+
+class BatchingQueueListener:
+    """Drains the log queue on a single thread and hands records to the shipping handler in batches."""
+
+    _sentinel = None
+
+    def __init__(self, queue_handler, handler_factory, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL):
+        self.queue_handler = queue_handler
+        self.queue = queue_handler.queue
+        self.handler_factory = handler_factory
+        self.handler = None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.total_dropped = 0
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        queue_handler.listener = self
+
+    def ensure_started(self):
+        # Started lazily per PID: threads do not survive a fork, so each pre-forked worker needs its own.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                self.queue = queue.Queue(maxsize=self.queue.maxsize)
+                self.queue_handler.queue = self.queue
+                self.handler = None
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="promptwire-logs", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        try:
+            self.queue.put(self._sentinel, timeout=self.flush_interval)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=self.flush_interval * 2)
+        self._thread = None
+        if self.handler is not None:
+            self.handler.flush()
+
+    def _run(self):
+        # The shipping handler (and its AWS client) is built on the listener thread, off the import path.
+        try:
+            self.handler = self.handler_factory()
+        except Exception as e:
+            self.handler = logging.StreamHandler()
+            self.handler.handle(logging.makeLogRecord({"msg": f"CloudWatch log handler unavailable, logging to stderr: {str(e)}"}))
+
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._report_dropped()
+                continue
+
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = self._sentinel in batch
+            for record in batch:
+                if record is not self._sentinel and record.levelno >= self.handler.level:
+                    self.handler.handle(record)
+
+            self.handler.flush()
+            self._report_dropped()
+
+            if stopping:
+                return
+
+    def _report_dropped(self):
+        dropped = self.queue_handler.take_dropped()
+        if dropped:
+            self.total_dropped += dropped
+            publish_metric("LogRecordsDropped", dropped)
+
+
+_log_listener = None
+
+
+def get_log_stats():
+    if _log_listener is None:
+        return {"queued": 0, "dropped": 0}
+    return {
+        "queued": _log_listener.queue.qsize(),
+        "dropped": _log_listener.total_dropped + _log_listener.queue_handler.dropped_records
+    }
+
 
 def get_logger():
+    global _log_listener
+
     logger = logging.getLogger("promptwire")
     logger.setLevel(logging.INFO)
 
-    boto3_client = boto3.client(
-        "logs",
-        aws_access_key_id=get_env_variable("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=get_env_variable("AWS_SECRET_ACCESS_KEY"),
-        aws_session_token=get_env_variable("AWS_SESSION_TOKEN"),
-        region_name=get_env_variable("AWS_REGION")
-    )
+    if any(isinstance(h, DroppingQueueHandler) for h in logger.handlers):
+        return logger
 
-    handler = watchtower.CloudWatchLogHandler(
-        log_group_name=get_env_variable("SERVER_LOG_GROUP"),
-        log_stream_name=get_env_variable("SERVER_LOG_STREAM"),
-        boto3_client=boto3_client
-    )
+    def create_handler():
+        return watchtower.CloudWatchLogHandler(
+            log_group_name=get_env_variable("SERVER_LOG_GROUP"),
+            log_stream_name=get_env_variable("SERVER_LOG_STREAM"),
+            boto3_client=get_client("logs")
+        )
 
-    if not any(isinstance(h, watchtower.CloudWatchLogHandler) for h in logger.handlers):
-        logger.addHandler(handler)
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    _log_listener = BatchingQueueListener(queue_handler, create_handler)
+    atexit.register(_log_listener.stop)
+
+    logger.addHandler(queue_handler)
 
     return logger
 
 
+METRICS_NAMESPACE = "PromptWire"
+METRICS_FLUSH_INTERVAL = float(get_env_variable("METRICS_FLUSH_INTERVAL", "60"))
+# put_metric_data accepts at most 1000 metric datums per call and 150 distinct values per datum.
+METRICS_BATCH_SIZE = 1000
+HISTOGRAM_MAX_VALUES = 150
+
+
+class MetricsAggregator:
+    """Accumulates metric statistic sets in-process and ships them to CloudWatch from a background thread.
+
+    Histogram metrics are sent as value/count pairs instead, so CloudWatch can compute percentiles for them.
+    """
+
+    def __init__(self, namespace=METRICS_NAMESPACE, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.namespace = namespace
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._histograms = {}
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        if hasattr(os, "register_at_fork"):
+            # A lock held by another thread at fork time would stay locked forever in the child.
+            os.register_at_fork(after_in_child=self._reset_lock)
+
+    def record(self, metric_name, value, unit="Count"):
+        # Started first so that values recorded after a fork are not discarded by the child's reset.
+        self._ensure_started()
+        value = float(value)
+        with self._lock:
+            stats = self._stats.get((metric_name, unit))
+            if stats is None:
+                self._stats[(metric_name, unit)] = {
+                    "SampleCount": 1,
+                    "Sum": value,
+                    "Minimum": value,
+                    "Maximum": value
+                }
+            else:
+                stats["SampleCount"] += 1
+                stats["Sum"] += value
+                stats["Minimum"] = min(stats["Minimum"], value)
+                stats["Maximum"] = max(stats["Maximum"], value)
+
+    def record_histogram(self, metric_name, value, unit="Milliseconds"):
+        self._ensure_started()
+        # Two significant digits keeps the number of distinct values per flush small.
+        bucket = float(f"{float(value):.2g}")
+        with self._lock:
+            counts = self._histograms.setdefault((metric_name, unit), {})
+            counts[bucket] = counts.get(bucket, 0) + 1
+
+    def flush(self):
+        with self._lock:
+            stats, self._stats = self._stats, {}
+            histograms, self._histograms = self._histograms, {}
+
+        if not stats and not histograms:
+            return
+
+        timestamp = datetime.now(timezone.utc)
+        metric_data = [
+            {
+                "MetricName": metric_name,
+                "Timestamp": timestamp,
+                "StatisticValues": values,
+                "Unit": unit
+            }
+            for (metric_name, unit), values in stats.items()
+        ]
+
+        for (metric_name, unit), counts in histograms.items():
+            buckets = sorted(counts.items())
+            for i in range(0, len(buckets), HISTOGRAM_MAX_VALUES):
+                chunk = buckets[i:i + HISTOGRAM_MAX_VALUES]
+                metric_data.append({
+                    "MetricName": metric_name,
+                    "Timestamp": timestamp,
+                    "Values": [value for value, _ in chunk],
+                    "Counts": [count for _, count in chunk],
+                    "Unit": unit
+                })
+
+        for i in range(0, len(metric_data), METRICS_BATCH_SIZE):
+            batch = metric_data[i:i + METRICS_BATCH_SIZE]
+            try:
+                self._get_client().put_metric_data(Namespace=self.namespace, MetricData=batch)
+            except Exception as e:
+                logging.getLogger("promptwire").warning(f"Failed to publish {len(batch)} metrics: {str(e)}")
+
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=self.flush_interval)
+        self.flush()
+
+    def _get_client(self):
+        return get_client("cloudwatch")
+
+    def _ensure_started(self):
+        # Started lazily so that pre-fork servers get one flusher per worker process.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                self._stats = {}
+                self._histograms = {}
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="promptwire-metrics", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+metrics = MetricsAggregator()
+atexit.register(metrics.shutdown)
+
+
 def publish_metric(metric_name, value, unit="Count"):
-    cloudwatch = boto3.client(
-        "cloudwatch",
-        aws_access_key_id=get_env_variable("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=get_env_variable("AWS_SECRET_ACCESS_KEY"),
-        aws_session_token=get_env_variable("AWS_SESSION_TOKEN"),
-        region_name=get_env_variable("AWS_REGION")
-    )
-
-    cloudwatch.put_metric_data(
-        Namespace="PromptWire",
-        MetricData=[{
-            'MetricName': metric_name,
-            'Value': value,
-            'Unit': unit
-        }]
-    )
\ No newline at end of file
+    metrics.record(metric_name, value, unit)
+
+
+def publish_histogram(metric_name, value, unit="Milliseconds"):
+    metrics.record_histogram(metric_name, value, unit)
@@ -0,0 +1,175 @@
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from app.utils.cloudwatch_utils import get_logger, publish_metric
+from app.utils.tracing import trace_headers
+
+logger = get_logger()
+
+RETRY_STATUSES = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures and lets one trial call through after reset_timeout."""
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """True while allow() would reject a call; unlike allow(), checking does not claim the trial call."""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            return self._trial_in_flight or time.time() - self._opened_at < self.reset_timeout
+
+    @property
+    def retry_after(self) -> int:
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            return max(1, int(self.reset_timeout - (time.time() - self._opened_at)))
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.time() - self._opened_at >= self.reset_timeout and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        publish_metric(f"{self.name}CircuitRejected", 1)
+        raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"[HTTP] {self.name} circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"[HTTP] {self.name} circuit opened after {self._failures} failures")
+                    publish_metric(f"{self.name}CircuitOpened", 1)
+                self._opened_at = time.time()
+
+
+def _never_sent(error) -> bool:
+    # requests wraps urllib3's MaxRetryError, whose reason says why no connection could be made.
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, "reason", reason)
+    return isinstance(reason, (NewConnectionError, ConnectionRefusedError))
+
+
+def _retryable(method, error) -> bool:
+    if isinstance(error, requests.ConnectTimeout) or _never_sent(error):
+        return True
+    # Resets and dropped connections may hit after the handler ran, so only idempotent requests repeat them.
+    return method.upper() in IDEMPOTENT_METHODS
+
+
+class ServiceClient:
+    """Pooled keep-alive session to one upstream service with retries and per-operation circuit breakers.
+
+    Retried with jittered exponential backoff: connect timeouts and refused connections (the request
+    never reached the upstream), plus other connection errors and transient responses (502/503/504)
+    on idempotent methods only. Every 5xx counts as a breaker failure. Each operation gets its own
+    breaker, so one failing endpoint does not reject calls to the others.
+    """
+
+    def __init__(self, name, pool_size=10, connect_timeout=3, read_timeout=15, max_retries=2,
+                 backoff=0.2, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        # Sessions hold sockets, so each pre-forked worker builds its own.
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+                    self._pid = os.getpid()
+        return self._session
+
+    def breaker(self, operation=None) -> CircuitBreaker:
+        name = f"{self.name}{operation or ''}"
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+            return self._breakers[name]
+
+    def request(self, method, url, operation=None, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs["headers"] = {**trace_headers(), **(kwargs.get("headers") or {})}
+        breaker = self.breaker(operation)
+
+        for attempt in range(self.max_retries + 1):
+            breaker.allow()
+            if attempt:
+                time.sleep(self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+                publish_metric(f"{self.name}Retries", 1)
+
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectionError as e:
+                breaker.record_failure()
+                if attempt == self.max_retries or not _retryable(method, e):
+                    raise
+                logger.warning(f"[HTTP] {self.name} {method} {url} failed (attempt {attempt + 1}): {str(e)}")
+                continue
+            except Exception:
+                # Any other error still ends a half-open trial, or the breaker would stay wedged half-open.
+                breaker.record_failure()
+                raise
+
+            if response.status_code >= 500:
+                breaker.record_failure()
+                # A 502/503/504 can come from a proxy after the handler ran, so only idempotent requests repeat it.
+                if response.status_code in RETRY_STATUSES and method.upper() in IDEMPOTENT_METHODS \
+                        and attempt < self.max_retries:
+                    response.close()
+                    continue
+                return response
+
+            breaker.record_success()
+            return response
+
+    def get(self, url, operation=None, **kwargs) -> requests.Response:
+        return self.request("GET", url, operation=operation, **kwargs)
+
+    def post(self, url, operation=None, **kwargs) -> requests.Response:
+        return self.request("POST", url, operation=operation, **kwargs)
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+import bcrypt
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from instance.config import get_env_variable
+from app.utils.cloudwatch_utils import publish_metric
+
+BCRYPT_ROUNDS = int(get_env_variable("BCRYPT_ROUNDS", default=12))
+PASSWORD_HASH_WORKERS = int(get_env_variable("PASSWORD_HASH_WORKERS", default=2))
+# Hash jobs beyond this many in flight wait up to PASSWORD_HASH_WAIT seconds for a slot, then fail fast.
+PASSWORD_HASH_QUEUE_SIZE = int(get_env_variable("PASSWORD_HASH_QUEUE_SIZE", default=32))
+PASSWORD_HASH_WAIT = float(get_env_variable("PASSWORD_HASH_WAIT", default=2))
+PASSWORD_HASH_TIMEOUT = float(get_env_variable("PASSWORD_HASH_TIMEOUT", default=10))
+# Pool workers are started from a clean process rather than forked from a multi-threaded server worker.
+PASSWORD_HASH_START_METHOD = get_env_variable("PASSWORD_HASH_START_METHOD", default="forkserver")
+
+
+class PasswordHasherBusy(RuntimeError):
+    pass
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_QUEUE_SIZE)
+_in_flight = 0
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    # Created lazily and per PID so pre-fork servers do not share a pool with their parent.
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                context = multiprocessing.get_context(PASSWORD_HASH_START_METHOD)
+                if PASSWORD_HASH_START_METHOD == "forkserver":
+                    # The server preloads __main__ by default; workers only need bcrypt.
+                    context.set_forkserver_preload([])
+                _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, mp_context=context)
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _submit(metric_name, fn, *args):
+    global _in_flight
+
+    if not _slots.acquire(timeout=PASSWORD_HASH_WAIT):
+        publish_metric("PasswordHashRejected", 1)
+        raise PasswordHasherBusy("Password hashing queue is full")
+
+    with _executor_lock:
+        _in_flight += 1
+        publish_metric("PasswordHashQueueDepth", _in_flight)
+
+    start_time = time.time()
+
+    def release(_future):
+        global _in_flight
+        with _executor_lock:
+            _in_flight -= 1
+        _slots.release()
+        publish_metric(metric_name, (time.time() - start_time) * 1000, unit="Milliseconds")
+
+    try:
+        future = _get_executor().submit(fn, *args)
+    except Exception:
+        release(None)
+        raise
+
+    future.add_done_callback(release)
+    return future
+
+
+def _result(future):
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel()
+        publish_metric("PasswordHashTimeouts", 1)
+        raise PasswordHasherBusy("Password hashing timed out")
+
+
+def get_rounds(hashed: str) -> int:
+    # bcrypt hashes look like "$2b$<cost>$<salt+digest>".
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(hashed: str) -> bool:
+    return get_rounds(hashed) != BCRYPT_ROUNDS
+
+
+def hash_password_async(password: str):
+    # bcrypt's own functions are submitted so workers never import the app package.
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    return _submit("PasswordHashLatencyMs", bcrypt.hashpw, password.encode("utf-8"), salt)
+
+
+def hash_password(password: str) -> str:
+    return _result(hash_password_async(password)).decode("utf-8")
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    future = _submit("PasswordVerifyLatencyMs", bcrypt.checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+    return _result(future)
@@ -1,26 +1,210 @@
-import requests
+import json
+import os
+import threading
+import time
+from urllib.parse import urljoin
 from instance.config import get_env_variable
+from app.utils.answer_cache import SemanticAnswerCache, context_key
+from app.utils.http_client import CircuitOpenError, ServiceClient
+from app.utils.cloudwatch_utils import get_logger, publish_metric
+from app.utils.tracing import add_upstream_timings, parse_server_timing, record_stage, span
 
 QUERY_API_URL = get_env_variable("QUERY_TASK_API_URL")
+QUERY_CONNECT_TIMEOUT = float(get_env_variable("QUERY_CONNECT_TIMEOUT", default=3))
+QUERY_READ_TIMEOUT = float(get_env_variable("QUERY_READ_TIMEOUT", default=15))
+QUERY_STREAM_TIMEOUT = float(get_env_variable("QUERY_STREAM_TIMEOUT", default=60))
+EMBED_API_URL = get_env_variable("QUERY_EMBED_API_URL", default=urljoin(QUERY_API_URL, "/api/embed-query"))
+INDEX_VERSION_API_URL = get_env_variable("INDEX_VERSION_API_URL", default=urljoin(QUERY_API_URL, "/weaviate/index-version"))
 
-def get_ai_answer(question: str, num_sources: int = 3, chat_history=None) -> tuple[str, list[str]]:
+ANSWER_CACHE_ENABLED = get_env_variable("ANSWER_CACHE_ENABLED", default="true").lower() == "true"
+ANSWER_CACHE_INDEX_POLL_INTERVAL = float(get_env_variable("ANSWER_CACHE_INDEX_POLL_INTERVAL", default=30))
+
+logger = get_logger()
+
+# Query, embedding and index-version calls each trip their own breaker on the shared client.
+QUERY_OPERATION = "Query"
+
+query_client = ServiceClient(
+    "QueryService",
+    pool_size=int(get_env_variable("QUERY_POOL_SIZE", default=10)),
+    connect_timeout=QUERY_CONNECT_TIMEOUT,
+    read_timeout=QUERY_READ_TIMEOUT,
+    max_retries=int(get_env_variable("QUERY_MAX_RETRIES", default=2)),
+    failure_threshold=int(get_env_variable("QUERY_CIRCUIT_FAILURES", default=5)),
+    reset_timeout=float(get_env_variable("QUERY_CIRCUIT_RESET", default=30))
+)
+
+answer_cache = SemanticAnswerCache(
+    max_entries=int(get_env_variable("ANSWER_CACHE_SIZE", default=1000)),
+    ttl_seconds=float(get_env_variable("ANSWER_CACHE_TTL", default=300)),
+    threshold=float(get_env_variable("ANSWER_CACHE_SIMILARITY", default=0.95))
+)
+
+_index_watcher_pid = None
+_index_watcher_lock = threading.Lock()
+# Query service processes whose index generation is remembered; older ones (e.g. restarted workers) are forgotten.
+INDEX_VERSION_MAX_PROCESSES = 64
+
+def _index_changed(generations: dict, process: str, generation: int, first_poll: bool) -> bool:
+    """Record a polled (process, generation) and report whether the index may have changed since the last poll.
+
+    Each query service process counts its own index and delete calls, so generations are compared per
+    process: polls alternating between processes are not a change. A process seen for the first time
+    may already have served writes, so it counts as a change except on the very first poll.
+    """
+    previous = generations.pop(process, None)
+    generations[process] = generation
+    while len(generations) > INDEX_VERSION_MAX_PROCESSES:
+        generations.pop(next(iter(generations)))
+    if previous is None:
+        return not first_poll
+    return generation != previous
+
+def _watch_index_version():
+    # The query service bumps its index version on every index or delete call, so a change invalidates cached answers.
+    generations = {}
+    first_poll = True
+    while True:
+        try:
+            response = query_client.get(INDEX_VERSION_API_URL, operation="IndexVersion", timeout=(QUERY_CONNECT_TIMEOUT, 5))
+            if response.status_code == 200:
+                current = response.json()
+                if _index_changed(generations, current["process"], current["generation"], first_poll):
+                    answer_cache.clear()
+                    publish_metric("AnswerCacheInvalidations", 1)
+                    logger.info(f"[ANSWER CACHE] Index changed (now {current['version']}), cache cleared")
+                first_poll = False
+        except Exception as e:
+            logger.warning(f"[ANSWER CACHE] Failed to poll index version: {str(e)}")
+        time.sleep(ANSWER_CACHE_INDEX_POLL_INTERVAL)
+
+def _ensure_index_watcher():
+    global _index_watcher_pid
+    if _index_watcher_pid == os.getpid():
+        return
+    with _index_watcher_lock:
+        if _index_watcher_pid == os.getpid():
+            return
+        _index_watcher_pid = os.getpid()
+        threading.Thread(target=_watch_index_version, name="promptwire-index-version", daemon=True).start()
+
+def embed_question(question: str):
     try:
-        body = {"num_sources": num_sources, "question": question}
-        if chat_history is not None:
-            body["chat_history"] = chat_history
-        response = requests.post(
-            QUERY_API_URL,
-            json=body,
-            timeout=15
-        )
+        with span("cache_embed"):
+            response = query_client.post(EMBED_API_URL, operation="Embed", json={"text": question}, timeout=(QUERY_CONNECT_TIMEOUT, 5))
+        if response.status_code != 200:
+            return None
+        return response.json().get("embedding")
+    except Exception as e:
+        logger.warning(f"[ANSWER CACHE] Failed to embed question: {str(e)}")
+        return None
+
+def lookup_cached_answer(question: str, num_sources: int, chat_history=None, search=None) -> tuple:
+    """Return (cached answer or None, cache entry info to pass to store_cached_answer)."""
+    if not ANSWER_CACHE_ENABLED:
+        return None, None
+
+    _ensure_index_watcher()
+    entry = {"context": context_key(question, chat_history, num_sources, search), "embedding": None, "generation": answer_cache.generation}
+
+    cached = answer_cache.get_exact(question, entry["context"])
+    if cached:
+        return cached, entry
+
+    entry["embedding"] = embed_question(question)
+    if entry["embedding"]:
+        cached = answer_cache.get_similar(entry["context"], entry["embedding"])
+    else:
+        publish_metric("AnswerCacheMisses", 1)
+
+    return cached, entry
+
+def store_cached_answer(question: str, entry, answer: str, sources: list[str]):
+    if entry is not None:
+        answer_cache.put(question, entry["context"], entry["embedding"], answer, sources, generation=entry["generation"])
+
+def _build_body(question: str, num_sources: int, chat_history=None, search=None) -> dict:
+    body = {"num_sources": num_sources, "question": question}
+    if chat_history is not None:
+        body["chat_history"] = chat_history
+    if search:
+        body.update(search)
+    return body
+
+def get_ai_answer(question: str, num_sources: int = 3, chat_history=None, search=None) -> tuple[str, list[str]]:
+    with span("cache_lookup"):
+        cached, entry = lookup_cached_answer(question, num_sources, chat_history, search)
+    if cached:
+        return cached
+
+    try:
+        body = _build_body(question, num_sources, chat_history, search)
+        with span("query_service"):
+            response = query_client.post(QUERY_API_URL, operation=QUERY_OPERATION, json=body)
 
         if response.status_code != 200:
             raise RuntimeError(f"API responded with status {response.status_code}")
 
+        add_upstream_timings(parse_server_timing(response.headers.get("Server-Timing")))
         data = response.json()
         answer = data.get("answer", "No answer returned.")
         sources = data.get("sources", [])
-        return answer, sources
 
+    except CircuitOpenError:
+        raise
     except Exception as e:
-        raise RuntimeError(f"Failed to fetch AI answer: {e}")
\ No newline at end of file
+        raise RuntimeError(f"Failed to fetch AI answer: {e}")
+
+    store_cached_answer(question, entry, answer, sources)
+    return answer, sources
+
+def stream_ai_answer(question: str, num_sources: int = 3, chat_history=None, search=None):
+    """Yield NDJSON events ({"type": "token" | "sources" | "done" | "error", ...}) from the query service."""
+    with span("cache_lookup"):
+        cached, entry = lookup_cached_answer(question, num_sources, chat_history, search)
+    if cached:
+        answer, sources = cached
+        yield {"type": "token", "content": answer}
+        yield {"type": "sources", "sources": sources}
+        yield {"type": "done"}
+        return
+
+    body = _build_body(question, num_sources, chat_history, search)
+    body["stream"] = True
+
+    started = time.perf_counter()
+    try:
+        response = query_client.post(
+            QUERY_API_URL,
+            operation=QUERY_OPERATION,
+            json=body,
+            stream=True,
+            timeout=(QUERY_CONNECT_TIMEOUT, QUERY_STREAM_TIMEOUT)
+        )
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Failed to fetch AI answer: {e}")
+
+    tokens = []
+    sources = []
+
+    with response:
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to fetch AI answer: API responded with status {response.status_code}")
+
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            event = json.loads(line)
+            if event.get("type") == "token":
+                if not tokens:
+                    record_stage("query_first_token", (time.perf_counter() - started) * 1000)
+                tokens.append(event.get("content", ""))
+            elif event.get("type") == "sources":
+                sources = event.get("sources", [])
+            elif event.get("type") == "done":
+                record_stage("query_service", (time.perf_counter() - started) * 1000)
+                add_upstream_timings(event.pop("timings", None))
+                store_cached_answer(question, entry, "".join(tokens), sources)
+            yield event
@@ -0,0 +1,130 @@
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from flask import g, has_app_context, request
+from app.utils.cloudwatch_utils import publish_histogram
+
+REQUEST_ID_HEADER = "X-Request-ID"
+SERVER_TIMING_HEADER = "Server-Timing"
+# Stage histograms are published as <prefix>Stage<Name>LatencyMs, e.g. ServerStageDbWriteLatencyMs.
+STAGE_METRIC_PREFIX = "Server"
+# Upstream stage timings are folded into this request's trace under this prefix.
+UPSTREAM_PREFIX = "qs_"
+
+_SERVER_TIMING_ENTRY = re.compile(r"^\s*([\w-]+)\s*;\s*dur=([0-9.]+)")
+_REQUEST_ID = re.compile(r"^[\w.-]{1,128}$")
+
+
+class RequestTrace:
+    """Stage durations for one request, reported in the Server-Timing header."""
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, duration_ms):
+        # Stages that run more than once in a request (e.g. two DynamoDB writes) are summed.
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + duration_ms
+
+    def get(self, stage):
+        with self._lock:
+            return self.stages.get(stage, 0.0)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def timings(self):
+        with self._lock:
+            return {stage: round(duration_ms, 1) for stage, duration_ms in self.stages.items()}
+
+    def server_timing(self):
+        return ", ".join(f"{stage};dur={duration_ms}" for stage, duration_ms in self.timings().items())
+
+
+def start_trace(request_id=None):
+    if not request_id or not _REQUEST_ID.match(request_id):
+        request_id = uuid.uuid4().hex
+    g.trace = RequestTrace(request_id)
+    return g.trace
+
+
+def current_trace():
+    if not has_app_context():
+        return None
+    return g.get("trace")
+
+
+def get_request_id():
+    trace = current_trace()
+    return trace.request_id if trace else None
+
+
+def trace_headers():
+    request_id = get_request_id()
+    return {REQUEST_ID_HEADER: request_id} if request_id else {}
+
+
+def stage_metric_name(stage):
+    return f"{STAGE_METRIC_PREFIX}Stage" + "".join(part.capitalize() for part in stage.split("_")) + "LatencyMs"
+
+
+def record_stage(stage, duration_ms):
+    trace = current_trace()
+    if trace is not None:
+        trace.add(stage, duration_ms)
+    publish_histogram(stage_metric_name(stage), duration_ms)
+
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, (time.perf_counter() - start) * 1000)
+
+
+def add_upstream_timings(timings):
+    """Fold another service's stage timings into the current trace without re-publishing them."""
+    trace = current_trace()
+    if trace is None or not timings:
+        return
+    for stage, duration_ms in timings.items():
+        try:
+            trace.add(f"{UPSTREAM_PREFIX}{stage}", float(duration_ms))
+        except (TypeError, ValueError):
+            continue
+
+
+def parse_server_timing(header):
+    timings = {}
+    for entry in (header or "").split(","):
+        match = _SERVER_TIMING_ENTRY.match(entry)
+        if match:
+            timings[match.group(1)] = float(match.group(2))
+    return timings
+
+
+def init_tracing(app):
+    @app.before_request
+    def begin_request_trace():
+        start_trace(request.headers.get(REQUEST_ID_HEADER))
+
+    @app.after_request
+    def add_trace_headers(response):
+        trace = current_trace()
+        if trace is None:
+            return response
+        # Streamed bodies are still being produced here, so "total" only covers complete responses.
+        if not response.is_streamed:
+            trace.add("total", trace.elapsed_ms())
+        response.headers[REQUEST_ID_HEADER] = trace.request_id
+        timing = trace.server_timing()
+        if timing:
+            response.headers[SERVER_TIMING_HEADER] = timing
+        return response
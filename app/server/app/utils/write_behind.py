@@ -0,0 +1,144 @@
+import atexit
+import os
+import queue
+import random
+import threading
+import time
+from app.utils.cloudwatch_utils import get_logger, publish_metric
+
+logger = get_logger()
+
+
+class WriteBehindBuffer:
+    """Queues item writes for a background thread and keeps them readable until they are durable.
+
+    write_batch(items) must return the items that were not processed (e.g. DynamoDB UnprocessedItems);
+    those are retried with jittered backoff. on_written(items) runs once a batch has been fully written.
+    """
+
+    def __init__(self, name, write_batch, on_written=None, max_size=1000, batch_size=25, max_retries=5):
+        self.name = name
+        self.write_batch = write_batch
+        self.on_written = on_written
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=max_size)
+        self._overlay = {}
+        self._queued = {}
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._thread = None
+        self._pid = None
+        atexit.register(self.shutdown)
+
+    def stage(self, key, items):
+        with self._lock:
+            self._overlay.setdefault(key, []).extend(items)
+
+    def submit(self, key, items) -> bool:
+        """Queue items for writing. Returns False when the buffer is full, in which case nothing is kept."""
+        self._ensure_started()
+        staged = self.pending(key)
+        self.stage(key, [item for item in items if not any(item is other for other in staged)])
+
+        with self._lock:
+            self._queued[key] = self._queued.get(key, 0) + 1
+
+        try:
+            self._queue.put_nowait((key, items))
+        except queue.Full:
+            self._done(key)
+            self.discard(key, items)
+            publish_metric(f"{self.name}BufferFull", 1)
+            return False
+
+        publish_metric(f"{self.name}BufferDepth", self._queue.qsize())
+        return True
+
+    def pending(self, key) -> list:
+        with self._lock:
+            return list(self._overlay.get(key, []))
+
+    def flush(self, match, timeout=5) -> bool:
+        """Wait until nothing is queued for keys where match(key) is true; returns False on timeout."""
+        with self._drained:
+            return self._drained.wait_for(lambda: not any(match(key) for key in self._queued), timeout=timeout)
+
+    def _done(self, key):
+        with self._drained:
+            if self._queued.get(key, 0) <= 1:
+                self._queued.pop(key, None)
+                self._drained.notify_all()
+            else:
+                self._queued[key] -= 1
+
+    def discard(self, key, items):
+        with self._lock:
+            remaining = [item for item in self._overlay.get(key, []) if not any(item is other for other in items)]
+            if remaining:
+                self._overlay[key] = remaining
+            else:
+                self._overlay.pop(key, None)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, name=f"promptwire-{self.name}", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            entries = [self._queue.get()]
+            while len(entries) < self.batch_size:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write(entries)
+            finally:
+                for key, items in entries:
+                    self.discard(key, items)
+                    self._done(key)
+                    self._queue.task_done()
+
+    def _write(self, entries):
+        items = [item for _, entry_items in entries for item in entry_items]
+        start_time = time.time()
+        remaining = items
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(min(2 ** attempt * 0.05, 2) * random.uniform(0.5, 1.5))
+            try:
+                remaining = self.write_batch(remaining)
+            except Exception as e:
+                logger.warning(f"[WRITE BEHIND] {self.name} batch write failed (attempt {attempt + 1}): {str(e)}")
+            if not remaining:
+                break
+
+        if remaining:
+            logger.error(f"[WRITE BEHIND] {self.name} dropped {len(remaining)} items after {self.max_retries} retries")
+            publish_metric(f"{self.name}WritesFailed", len(remaining))
+
+        written = [item for item in items if not any(item is other for other in remaining)]
+        if written and self.on_written is not None:
+            try:
+                self.on_written(written)
+            except Exception as e:
+                logger.error(f"[WRITE BEHIND] {self.name} post-write hook failed: {str(e)}", exc_info=True)
+
+        publish_metric(f"{self.name}WritesFlushed", len(written))
+        publish_metric(f"{self.name}FlushLatencyMs", (time.time() - start_time) * 1000, unit="Milliseconds")
+
+    def shutdown(self, timeout=5):
+        if self._pid != os.getpid():
+            return
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
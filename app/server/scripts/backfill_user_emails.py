@@ -0,0 +1,75 @@
+"""Write the "email#<email>" lookup items that user_model uses to find users by email.
+
+Users created before the lookup items existed can only be found by scanning, so run this once
+(from app/server) before deploying the key-based login path:
+
+    python -m scripts.backfill_user_emails
+
+If several users share an address, the earliest-created one keeps the mapping and the rest are reported.
+"""
+import argparse
+from app.dynamo_utils import get_dynamodb_resource
+from instance.config import get_env_variable
+
+EMAIL_KEY_PREFIX = "email#"
+
+
+def collect_users(users_table):
+    users = {}
+    existing = {}
+    scan_kwargs = {}
+
+    while True:
+        response = users_table.scan(**scan_kwargs)
+
+        for item in response.get("Items", []):
+            if item["user_id"].startswith(EMAIL_KEY_PREFIX):
+                existing[item["user_id"]] = item["owner_id"]
+            elif item.get("email"):
+                users.setdefault(item["email"].strip().lower(), []).append(item)
+
+        if "LastEvaluatedKey" not in response:
+            break
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    return users, existing
+
+
+def backfill(users_table, dry_run=False):
+    users, existing = collect_users(users_table)
+    written = 0
+    duplicates = []
+
+    with users_table.batch_writer() as batch:
+        for email, items in users.items():
+            items = sorted(items, key=lambda item: item.get("created_at", ""))
+            duplicates.extend((email, item["user_id"]) for item in items[1:])
+
+            key = f"{EMAIL_KEY_PREFIX}{email}"
+            if key in existing:
+                continue
+            if not dry_run:
+                batch.put_item(Item={"user_id": key, "owner_id": items[0]["user_id"]})
+            written += 1
+
+    return written, duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--table", default=get_env_variable("DYNAMODB_USERS_TABLE", default=""), help="users table")
+    parser.add_argument("--dry-run", action="store_true", help="scan and report without writing")
+    args = parser.parse_args()
+
+    if not args.table:
+        parser.error("--table is required when DYNAMODB_USERS_TABLE is not set")
+
+    written, duplicates = backfill(get_dynamodb_resource().Table(args.table), dry_run=args.dry_run)
+
+    print(f"{'Would write' if args.dry_run else 'Wrote'} {written} email lookup items to {args.table}")
+    for email, user_id in duplicates:
+        print(f"[DUPLICATE] {email} is also used by user {user_id}, which will not be reachable by login")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Copy chat messages from a legacy (user_id, time_stamp) table into the composite-key schema.
+
+The composite table is keyed on user_id (HASH) and chat_key = "<chat_id>#<time_stamp>" (RANGE),
+which lets chat_model read a single chat with a key condition. The per-chat thread summaries that
+back list_chats ("#thread#<chat_id>" items) are rebuilt from the copied messages, and the table gets
+the user_id/last_used index that pages them newest first (added if an existing target lacks it). Run from app/server:
+
+    python -m scripts.migrate_chat_keys --source promptwire-chats --target promptwire-chats-v2 --create-table
+
+then point DYNAMODB_CHAT_TABLE at the target table and set DYNAMODB_CHAT_SCHEMA=composite.
+Pass --threads-only to rebuild just the thread summaries of a table that is already composite.
+"""
+import argparse
+from app.dynamo_utils import get_dynamodb_resource
+from instance.config import get_env_variable
+
+
+THREADS_INDEX = get_env_variable("DYNAMODB_CHAT_THREADS_INDEX", default="user_id-last_used-index")
+THREADS_INDEX_SCHEMA = {
+    "IndexName": THREADS_INDEX,
+    "KeySchema": [
+        {"AttributeName": "user_id", "KeyType": "HASH"},
+        {"AttributeName": "last_used", "KeyType": "RANGE"}
+    ],
+    "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["chat_id", "title", "message_count"]}
+}
+
+
+def create_composite_table(dynamodb, table_name):
+    table = dynamodb.create_table(
+        TableName=table_name,
+        KeySchema=[
+            {"AttributeName": "user_id", "KeyType": "HASH"},
+            {"AttributeName": "chat_key", "KeyType": "RANGE"}
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "user_id", "AttributeType": "S"},
+            {"AttributeName": "chat_key", "AttributeType": "S"},
+            {"AttributeName": "last_used", "AttributeType": "S"}
+        ],
+        GlobalSecondaryIndexes=[THREADS_INDEX_SCHEMA],
+        BillingMode="PAY_PER_REQUEST"
+    )
+    table.wait_until_exists()
+    return table
+
+
+def ensure_threads_index(dynamodb, table):
+    """Add the last_used index that list_chats_page reads to a composite table created before it existed."""
+    if any(index["IndexName"] == THREADS_INDEX for index in table.global_secondary_indexes or []):
+        return False
+    dynamodb.meta.client.update_table(
+        TableName=table.name,
+        AttributeDefinitions=[
+            {"AttributeName": "user_id", "AttributeType": "S"},
+            {"AttributeName": "last_used", "AttributeType": "S"}
+        ],
+        GlobalSecondaryIndexUpdates=[{"Create": THREADS_INDEX_SCHEMA}]
+    )
+    return True
+
+
+THREAD_PREFIX = "#thread#"
+THREAD_TITLE_LENGTH = 100
+
+
+def summarize(threads, item):
+    key = (item["user_id"], item["chat_id"])
+    thread = threads.setdefault(key, {
+        "user_id": item["user_id"],
+        "chat_key": f"{THREAD_PREFIX}{item['chat_id']}",
+        "chat_id": item["chat_id"],
+        "last_used": item["time_stamp"],
+        "message_count": 0
+    })
+
+    thread["message_count"] += 1
+    thread["last_used"] = max(thread["last_used"], item["time_stamp"])
+
+    if item.get("role") == "user" and item["time_stamp"] <= thread.get("_title_ts", item["time_stamp"]):
+        thread["title"] = item.get("message", "")[:THREAD_TITLE_LENGTH]
+        thread["_title_ts"] = item["time_stamp"]
+
+
+def migrate(source_table, target_table, dry_run=False, threads_only=False):
+    scanned = 0
+    written = 0
+    threads = {}
+    scan_kwargs = {}
+
+    with target_table.batch_writer(overwrite_by_pkeys=["user_id", "chat_key"]) as batch:
+        while True:
+            response = source_table.scan(**scan_kwargs)
+
+            for item in response.get("Items", []):
+                scanned += 1
+                if "chat_id" not in item or "time_stamp" not in item:
+                    continue
+                if item.get("chat_key", "").startswith(THREAD_PREFIX):
+                    continue
+
+                summarize(threads, item)
+                if threads_only:
+                    continue
+
+                item["chat_key"] = f"{item['chat_id']}#{item['time_stamp']}"
+                if not dry_run:
+                    batch.put_item(Item=item)
+                written += 1
+
+            if "LastEvaluatedKey" not in response:
+                break
+            scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+        for thread in threads.values():
+            thread.pop("_title_ts", None)
+            if not dry_run:
+                batch.put_item(Item=thread)
+            written += 1
+
+    return scanned, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=get_env_variable("DYNAMODB_CHAT_TABLE", default=""), help="legacy chat table")
+    parser.add_argument("--target", required=True, help="composite-key chat table")
+    parser.add_argument("--create-table", action="store_true", help="create the target table if it does not exist")
+    parser.add_argument("--dry-run", action="store_true", help="scan and count without writing")
+    parser.add_argument("--threads-only", action="store_true", help="only rebuild thread summaries in an already composite --source")
+    args = parser.parse_args()
+
+    if not args.source:
+        parser.error("--source is required when DYNAMODB_CHAT_TABLE is not set")
+
+    dynamodb = get_dynamodb_resource()
+    target_table = dynamodb.Table(args.target)
+
+    try:
+        target_table.load()
+    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
+        if not args.create_table:
+            parser.error(f"Target table {args.target} does not exist; pass --create-table to create it")
+        target_table = create_composite_table(dynamodb, args.target)
+    else:
+        if not args.dry_run and ensure_threads_index(dynamodb, target_table):
+            print(f"Creating index {THREADS_INDEX} on {args.target}; it backfills in the background")
+
+    scanned, written = migrate(
+        dynamodb.Table(args.source),
+        target_table,
+        dry_run=args.dry_run,
+        threads_only=args.threads_only
+    )
+    print(f"Scanned {scanned} items from {args.source}, {'would write' if args.dry_run else 'wrote'} {written} to {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,19 @@ from flask import Flask
 from flask_cors import CORS
 from config.env_loader import get_env_variable
 from utils.cloudwatch_utils import get_logger
+from utils.tracing import init_tracing
 from routes.home import home_bp
 from routes.health import health_bp
 from routes.query_answer import query_bp
 from routes.index_article import index_bp
+from routes.index_articles import index_articles_bp
 from routes.list_article_by_id import list_article_id_bp
 from routes.list_articles import list_bp
 from routes.delete_article import delete_bp
 from routes.add_article import add_article_bp
 from routes.count_articles import count_bp
+from routes.embed_query import embed_bp
+from routes.index_version import index_version_bp
 
 PORT = int(get_env_variable("PORT", 5000))
 DEBUG = get_env_variable("DEBUG", "false").lower() == "true"
@@ -18,6 +22,7 @@ FRONTEND_URLS = get_env_variable("FRONTEND_URLS", "").split(",")
 
 app = Flask(__name__)
 CORS(app, origins=FRONTEND_URLS)
+init_tracing(app)
 
 logger = get_logger()
 logger.info("PromptWire Flask API started.")
@@ -26,11 +31,14 @@ app.register_blueprint(home_bp)
 app.register_blueprint(health_bp)
 app.register_blueprint(query_bp)
 app.register_blueprint(index_bp)
+app.register_blueprint(index_articles_bp)
 app.register_blueprint(list_article_id_bp)
 app.register_blueprint(list_bp)
 app.register_blueprint(delete_bp)
 app.register_blueprint(add_article_bp)
 app.register_blueprint(count_bp)
+app.register_blueprint(embed_bp)
+app.register_blueprint(index_version_bp)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=PORT, debug=DEBUG)
\ No newline at end of file
@@ -1,14 +1,13 @@
 from flask import Blueprint, request, jsonify
-from weaviate_client.client import client
-from config.env_loader import get_env_variable
+from weaviate_client.indexing import index_documents
 from utils.cloudwatch_utils import get_logger, publish_metric
+from utils.index_version import bumps_index_version
 
 add_article_bp = Blueprint("add_article", __name__)
 logger = get_logger()
 
-WEAVIATE_CLASS = get_env_variable("WEAVIATE_CLASS")
-
 @add_article_bp.route("/weaviate/add-article", methods=["POST"])
+@bumps_index_version
 def add_article():
     data = request.get_json()
     page_content = data.get("page_content")
@@ -18,20 +17,22 @@ def add_article():
         logger.warning("Missing 'page_content' in manual add request")
         return jsonify({"error": "Missing page_content"}), 400
 
+    if not isinstance(metadata, dict):
+        logger.warning("Non-object 'metadata' in manual add request")
+        return jsonify({"error": "metadata must be an object"}), 400
+
     try:
-        client.collections.get(WEAVIATE_CLASS).data.insert(
-            properties={
-                "page_content": page_content,
-                **metadata
-            }
-        )
-
-        logger.info(f"Manually added article with metadata: {metadata}")
+        # Same chunking path as the index routes, so re-adding a chunked article also removes its leftover chunks.
+        result = index_documents([{"page_content": page_content, "metadata": metadata}])[0]
+        if result["status"] != "success":
+            raise RuntimeError(result.get("error"))
+
+        logger.info(f"Manually added article {result['id']} as {result['chunks']} chunks with metadata: {metadata}")
         publish_metric("ArticlesManuallyAdded", 1)
 
-        return jsonify({"status": "success"}), 200
+        return jsonify({"status": "success", "id": result["id"], "chunks": result["chunks"]}), 200
 
     except Exception as e:
         logger.error(f"Failed to manually add article: {str(e)}", exc_info=True)
         publish_metric("AddErrors", 1)
-        return jsonify({"error": "Failed to add article"}), 500
\ No newline at end of file
+        return jsonify({"error": "Failed to add article"}), 500
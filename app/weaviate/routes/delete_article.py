@@ -3,23 +3,59 @@ from weaviate_client.client import client
 from config.env_loader import get_env_variable
 from weaviate.classes.query import Filter
 from utils.cloudwatch_utils import get_logger, publish_metric
+from utils.article_ids import article_uuid, chunk_uuid
+from utils.index_version import bumps_index_version
 
 delete_bp = Blueprint("delete_article", __name__)
 logger = get_logger()
 
 WEAVIATE_CLASS = get_env_variable("WEAVIATE_CLASS")
+TITLE_MATCH_LIMIT = 100
+
+def delete_by_article_id(article_id):
+    uid = article_uuid(article_id)
+
+    try:
+        collection = client.collections.get(WEAVIATE_CLASS)
+        first = collection.query.fetch_object_by_id(uid, return_properties=["chunk_count"])
+        if first is None:
+            logger.info(f"No article found with article_id: {article_id}")
+            publish_metric("DeleteNotFound", 1)
+            return jsonify({"error": "Article not found"}), 404
+
+        # Every chunk id is derived from the article_id, so all of them are removed by key.
+        chunk_count = first.properties.get("chunk_count") or 1
+        collection.data.delete_many(
+            where=Filter.by_id().contains_any([chunk_uuid(article_id, i) for i in range(chunk_count)])
+        )
+
+        logger.info(f"Deleted article with article_id '{article_id}' ({chunk_count} chunks) and UUID: {uid}")
+        publish_metric("ArticlesDeleted", 1)
+
+        return jsonify({"status": "deleted", "uuid": uid, "chunks": chunk_count}), 200
+
+    except Exception as e:
+        logger.error(f"Error deleting article with ID {article_id}: {str(e)}", exc_info=True)
+        publish_metric("DeleteErrors", 1)
+        return jsonify({"error": "Failed to delete article"}), 500
 
 @delete_bp.route("/weaviate/delete-article", methods=["DELETE"])
+@bumps_index_version
 def delete_article():
+    article_id = request.args.get("article_id")
+    if article_id:
+        return delete_by_article_id(article_id)
+
     title = request.args.get("title")
     if not title:
-        logger.warning("Missing 'title' in delete request")
-        return jsonify({"error": "Missing title param"}), 400
+        logger.warning("Missing 'article_id' or 'title' in delete request")
+        return jsonify({"error": "Missing article_id or title param"}), 400
 
     try:
         results = client.collections.get(WEAVIATE_CLASS).query.fetch_objects(
             filters=Filter.by_property("title").equal(title),
-            limit=1
+            limit=TITLE_MATCH_LIMIT,
+            return_properties=["article_id", "chunk_index"]
         )
 
         if not results.objects:
@@ -27,6 +63,16 @@ def delete_article():
             publish_metric("DeleteNotFound", 1)
             return jsonify({"error": "Article not found"}), 404
 
+        # Chunks of one article share its title, so matches are counted per article.
+        articles = {obj.properties.get("article_id") or str(obj.uuid) for obj in results.objects}
+        if len(articles) > 1:
+            logger.warning(f"Refusing to delete by title '{title}': more than one article matches")
+            publish_metric("DeleteAmbiguous", 1)
+            return jsonify({"error": "More than one article has this title; delete by article_id"}), 409
+
+        if results.objects[0].properties.get("chunk_index") is not None:
+            return delete_by_article_id(results.objects[0].properties["article_id"])
+
         uid = results.objects[0].uuid
         client.collections.get(WEAVIATE_CLASS).data.delete_by_id(uid)
 
@@ -38,4 +84,4 @@ def delete_article():
     except Exception as e:
         logger.error(f"Error deleting article titled '{title}': {str(e)}", exc_info=True)
         publish_metric("DeleteErrors", 1)
-        return jsonify({"error": "Failed to delete article"}), 500
\ No newline at end of file
+        return jsonify({"error": "Failed to delete article"}), 500
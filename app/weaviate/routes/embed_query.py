@@ -0,0 +1,30 @@
+from flask import Blueprint, request, jsonify
+from weaviate_client.vectorstore import embedding
+from utils.cloudwatch_utils import get_logger, publish_metric
+import time
+
+embed_bp = Blueprint("embed_query", __name__)
+logger = get_logger()
+
+@embed_bp.route("/api/embed-query", methods=["POST"])
+def embed_query():
+    start_time = time.time()
+    data = request.get_json()
+    text = data.get("text", "")
+
+    if not text:
+        logger.warning("Missing 'text' field in embed request")
+        return jsonify({"error": "Missing 'text'"}), 400
+
+    try:
+        vector = embedding.embed_query(text)
+
+        publish_metric("QueriesEmbedded", 1)
+        publish_metric("EmbedLatencyMs", (time.time() - start_time) * 1000, unit="Milliseconds")
+
+        return jsonify({"embedding": vector}), 200
+
+    except Exception as e:
+        logger.error(f"Error in /api/embed-query: {str(e)}", exc_info=True)
+        publish_metric("EmbedErrors", 1)
+        return jsonify({"error": "Failed to embed text"}), 500
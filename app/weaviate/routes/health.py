@@ -1,18 +1,16 @@
 from flask import Blueprint, jsonify
 from weaviate_client.client import client
-from utils.cloudwatch_utils import get_logger, publish_metric
+from utils.health_probe import HealthProber
 
 health_bp = Blueprint("health", __name__)
-logger = get_logger()
+
+health_prober = HealthProber({"weaviate": client.is_ready}, "WeaviateHealth")
 
 @health_bp.route("/health", methods=["GET"])
 def health_check():
-    try:
-        client.is_ready()
-        logger.info("Weaviate health check passed.")
-        publish_metric("WeaviateHealth", 1)
-        return jsonify({"status": "healthy"}), 200
-    except Exception as e:
-        logger.error(f"Weaviate health check failed: {str(e)}")
-        publish_metric("WeaviateHealth", 0)
-        return jsonify({"error": str(e), "status": "unhealthy"}), 500
\ No newline at end of file
+    snapshot = health_prober.snapshot()
+    return jsonify(snapshot), 200 if snapshot["status"] == "healthy" else 500
+
+@health_bp.route("/live", methods=["GET"])
+def liveness_check():
+    return jsonify({"status": "alive"}), 200
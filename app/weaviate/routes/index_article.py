@@ -1,12 +1,13 @@
 from flask import Blueprint, request, jsonify
-from langchain_core.documents import Document
-from weaviate_client.vectorstore import vectorstore
+from weaviate_client.indexing import index_documents
 from utils.cloudwatch_utils import get_logger, publish_metric
+from utils.index_version import bumps_index_version
 
 index_bp = Blueprint("index_article", __name__)
 logger = get_logger()
 
 @index_bp.route("/api/index-article", methods=["POST"])
+@bumps_index_version
 def index_article():
     data = request.get_json()
     page_content = data.get("page_content")
@@ -17,15 +18,17 @@ def index_article():
         return jsonify({"error": "Missing page_content"}), 400
 
     try:
-        doc = Document(page_content=page_content, metadata=metadata)
-        vectorstore.add_documents([doc])
+        # Keyed on article_id, so a redelivered article overwrites its earlier chunks instead of duplicating them.
+        result = index_documents([{"page_content": page_content, "metadata": metadata}])[0]
+        if result["status"] != "success":
+            raise RuntimeError(result.get("error"))
 
-        logger.info(f"Indexed article with metadata: {metadata}")
+        logger.info(f"Indexed article {result['id']} as {result['chunks']} chunks with metadata: {metadata}")
         publish_metric("ArticlesIndexed", 1)
 
-        return jsonify({"status": "success"}), 200
+        return jsonify({"status": "success", "id": result["id"], "chunks": result["chunks"]}), 200
 
     except Exception as e:
         logger.error(f"Error indexing article: {str(e)}", exc_info=True)
         publish_metric("IndexErrors", 1)
-        return jsonify({"error": "Failed to index article"}), 500
\ No newline at end of file
+        return jsonify({"error": "Failed to index article"}), 500
@@ -0,0 +1,55 @@
+import time
+from flask import Blueprint, request, jsonify
+from weaviate_client.indexing import index_documents
+from config.env_loader import get_env_variable
+from utils.cloudwatch_utils import get_logger, publish_metric
+from utils.index_version import bumps_index_version
+from utils.tracing import span
+
+index_articles_bp = Blueprint("index_articles", __name__)
+logger = get_logger()
+
+INDEX_MAX_ARTICLES = int(get_env_variable("INDEX_MAX_ARTICLES", "1000"))
+
+
+@index_articles_bp.route("/api/index-articles", methods=["POST"])
+@bumps_index_version
+def index_articles():
+    start_time = time.time()
+    data = request.get_json(silent=True) or {}
+    articles = data.get("articles")
+
+    if not isinstance(articles, list) or not articles:
+        logger.warning("Missing 'articles' in bulk index request")
+        return jsonify({"error": "Missing articles"}), 400
+
+    if len(articles) > INDEX_MAX_ARTICLES:
+        logger.warning(f"Bulk index request with {len(articles)} articles exceeds {INDEX_MAX_ARTICLES}")
+        return jsonify({"error": f"At most {INDEX_MAX_ARTICLES} articles per request"}), 413
+
+    try:
+        with span("bulk_import"):
+            results = index_documents(articles)
+
+        indexed = sum(1 for result in results if result["status"] == "success")
+        failed = len(results) - indexed
+        duration_s = time.time() - start_time
+        docs_per_second = indexed / duration_s if duration_s > 0 else 0.0
+
+        logger.info(f"Bulk indexed {indexed}/{len(results)} articles in {duration_s * 1000:.2f} ms ({docs_per_second:.1f} docs/sec)")
+        publish_metric("ArticlesIndexed", indexed)
+        publish_metric("ArticlesIndexFailed", failed)
+        publish_metric("IndexDocsPerSecond", docs_per_second, unit="Count/Second")
+
+        return jsonify({
+            "indexed": indexed,
+            "failed": failed,
+            "duration_ms": round(duration_s * 1000, 2),
+            "docs_per_second": round(docs_per_second, 2),
+            "results": results
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error bulk indexing articles: {str(e)}", exc_info=True)
+        publish_metric("IndexErrors", 1)
+        return jsonify({"error": "Failed to index articles"}), 500
@@ -0,0 +1,8 @@
+from flask import Blueprint, jsonify
+from utils.index_version import current_version
+
+index_version_bp = Blueprint("index_version", __name__)
+
+@index_version_bp.route("/weaviate/index-version", methods=["GET"])
+def index_version():
+    return jsonify(current_version()), 200
@@ -1,13 +1,31 @@
 from flask import Blueprint, request, jsonify
+from langchain_core.documents import Document
 from weaviate_client.client import client
 from config.env_loader import get_env_variable
 from weaviate.classes.query import Filter
 from utils.cloudwatch_utils import get_logger, publish_metric
+from utils.article_ids import article_uuid, chunk_uuid
+from utils.chunking import CHUNK_PROPERTIES, merge_passages
 
 list_article_id_bp = Blueprint("list_article_by_id", __name__)
 logger = get_logger()
 
 WEAVIATE_CLASS = get_env_variable("WEAVIATE_CLASS")
+# Objects written before ids were derived from article_id are only found by filtering; turn this off
+# once scripts/dedupe_articles.py has rewritten the collection.
+ARTICLE_ID_FILTER_FALLBACK = get_env_variable("ARTICLE_ID_FILTER_FALLBACK", "true").lower() == "true"
+
+def assemble_article(collection, first):
+    """Rebuild the whole article from its chunks, all of which are fetched by their derived ids."""
+    properties = first.properties
+    chunk_count = properties.get("chunk_count") or 1
+    if chunk_count > 1:
+        ids = [chunk_uuid(properties["article_id"], i) for i in range(1, chunk_count)]
+        results = collection.query.fetch_objects(filters=Filter.by_id().contains_any(ids), limit=len(ids))
+        chunks = [Document(page_content=properties["page_content"], metadata=properties)]
+        chunks += [Document(page_content=obj.properties["page_content"], metadata=obj.properties) for obj in results.objects]
+        properties = {**properties, "page_content": merge_passages(chunks)}
+    return {key: value for key, value in properties.items() if key not in CHUNK_PROPERTIES}
 
 @list_article_id_bp.route("/weaviate/list-article", methods=["GET"])
 def list_article():
@@ -17,11 +35,17 @@ def list_article():
         return jsonify({"error": "Missing article_id param"}), 400
 
     try:
-        results = client.collections.get(WEAVIATE_CLASS).query.fetch_objects(
-            filters=Filter.by_property("article_id").equal(article_id),
-            limit=1
-        )
-        articles = [obj.properties for obj in results.objects]
+        collection = client.collections.get(WEAVIATE_CLASS)
+        obj = collection.query.fetch_object_by_id(article_uuid(article_id))
+        articles = [assemble_article(collection, obj)] if obj is not None else []
+
+        if not articles and ARTICLE_ID_FILTER_FALLBACK:
+            results = collection.query.fetch_objects(
+                filters=Filter.by_property("article_id").equal(article_id),
+                limit=1
+            )
+            articles = [obj.properties for obj in results.objects]
+            publish_metric("ArticleLookupFallbacks", 1)
 
         logger.info(f"Fetched {len(articles)} articles for article_id: {article_id}")
         publish_metric("ArticlesFetchedById", len(articles))
@@ -31,4 +55,4 @@ def list_article():
     except Exception as e:
         logger.error(f"Error fetching article with ID {article_id}: {str(e)}", exc_info=True)
         publish_metric("ListByIdErrors", 1)
-        return jsonify({"error": "Failed to retrieve article"}), 500
\ No newline at end of file
+        return jsonify({"error": "Failed to retrieve article"}), 500
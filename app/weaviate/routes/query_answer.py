@@ -1,10 +1,14 @@
-from flask import Blueprint, request, jsonify
-from langchain.prompts import PromptTemplate
-from langchain_community.chat_models import ChatOpenAI
-from langchain.chains import RetrievalQA
+import hashlib
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from weaviate_client.vectorstore import vectorstore
 from config.env_loader import get_env_variable
 from utils.cloudwatch_utils import get_logger, publish_metric
+from utils.tracing import current_trace, get_request_id, record_stage
+from utils.single_flight import SingleFlight
+from utils.chain_factory import ChainFactory
+from utils.search_filters import InvalidSearchOptions, is_unknown_property_error, parse_search_options, weaviate_filters
+from utils.prompt_builder import PromptBuilder, history_turns
 import time
 
 query_bp = Blueprint("query_answer", __name__)
@@ -12,6 +16,158 @@ logger = get_logger()
 
 OPENAI_MODEL = get_env_variable("OPENAI_MODEL")
 OPENAI_TEMPERATURE = float(get_env_variable("OPENAI_TEMPERATURE"))
+QUERY_COALESCING_ENABLED = get_env_variable("QUERY_COALESCING_ENABLED", "true").lower() == "true"
+QUERY_COALESCING_WAIT = float(get_env_variable("QUERY_COALESCING_WAIT", "60"))
+# num_sources counts retrieved chunks; with grouping on, chunks of one article reach the prompt as one source.
+RETRIEVAL_GROUP_BY_ARTICLE = get_env_variable("RETRIEVAL_GROUP_BY_ARTICLE", "true").lower() == "true"
+MAX_NUM_SOURCES = int(get_env_variable("MAX_NUM_SOURCES", "10"))
+# Prompt budget in tokens, shared by the template, question, history and retrieved context.
+PROMPT_MAX_TOKENS = int(get_env_variable("PROMPT_MAX_TOKENS", "6000"))
+PROMPT_HISTORY_TOKENS = int(get_env_variable("PROMPT_HISTORY_TOKENS", "1000"))
+PROMPT_QUESTION_TOKENS = int(get_env_variable("PROMPT_QUESTION_TOKENS", "500"))
+# Earlier user turns added to the question for retrieval; 0 searches with the question alone.
+RETRIEVAL_HISTORY_TURNS = int(get_env_variable("RETRIEVAL_HISTORY_TURNS", "0"))
+
+query_flights = SingleFlight("QueryAnswer", wait_timeout=QUERY_COALESCING_WAIT)
+
+PROMPT_TEMPLATE = """
+    You are a helpful assistant that answers questions about recent news articles.
+    Use the following context to respond. If you don't know, just say you don't know. Don't make up answers.
+    Context: {context}
+    Question: {question}
+    Answer:
+""".strip()
+
+chains = ChainFactory(vectorstore, PROMPT_TEMPLATE, OPENAI_MODEL, OPENAI_TEMPERATURE, group_by_article=RETRIEVAL_GROUP_BY_ARTICLE)
+prompt_builder = PromptBuilder(chains.prompt, PROMPT_MAX_TOKENS, PROMPT_HISTORY_TOKENS, PROMPT_QUESTION_TOKENS)
+
+
+def retrieval_query(question, chat_history):
+    """The text embedded and keyword-matched for retrieval: the question, plus optionally the last few user turns."""
+    if RETRIEVAL_HISTORY_TURNS <= 0:
+        return question
+    user_turns = [turn for turn in history_turns(question, chat_history) if turn.startswith("User: ")]
+    earlier = [turn[len("User: "):] for turn in user_turns[-RETRIEVAL_HISTORY_TURNS:]]
+    return "\n".join(earlier + [question])
+
+
+def coalescing_key(question, k, chat_history, stream, search):
+    normalized = " ".join(question.lower().split())
+    context = {"history": chat_history, "search": search}
+    context_hash = hashlib.sha256(json.dumps(context, sort_keys=True).encode("utf-8")).hexdigest()
+    return (normalized, k, context_hash, stream)
+
+
+def extract_sources(documents):
+    sources = [
+        doc.metadata.get("url") or doc.metadata.get("link")
+        for doc in documents
+        if doc.metadata.get("url") or doc.metadata.get("link")
+    ]
+    return list(dict.fromkeys(sources))
+
+
+def embed_ms():
+    trace = current_trace()
+    return trace.get("embed") if trace else 0.0
+
+
+def record_search(started, embed_before):
+    # Retrieval embeds the query before searching; the embed stage is recorded separately.
+    retrieval_ms = (time.perf_counter() - started) * 1000
+    record_stage("search", max(0.0, retrieval_ms - (embed_ms() - embed_before)))
+
+
+def ndjson_event(event_type, **payload):
+    return json.dumps({"type": event_type, **payload}) + "\n"
+
+
+def publish_setup_time(setup_started):
+    # With the chain factory warm this should stay near zero; construction itself is ChainConstructionMs.
+    publish_metric("QueryChainSetupMs", (time.perf_counter() - setup_started) * 1000, unit="Milliseconds")
+
+
+def retrieve(retriever, question, chat_history):
+    started, embed_before = time.perf_counter(), embed_ms()
+    try:
+        documents = retriever.invoke(retrieval_query(question, chat_history))
+    except ValueError as e:
+        if not is_unknown_property_error(e):
+            raise
+        # No stored article has the filtered property, so none can match the filter.
+        logger.warning(f"Query {get_request_id()} filters on a property the index does not have: {str(e)}")
+        publish_metric("SearchFilterUnknownProperty", 1)
+        documents = []
+    record_search(started, embed_before)
+    return documents
+
+
+def stream_answer(question, chat_history, k, search, start_time):
+    try:
+        setup_started = time.perf_counter()
+        retriever = chains.retriever(k, search["alpha"], weaviate_filters(search))
+        llm = chains.llm(streaming=True)
+        publish_setup_time(setup_started)
+
+        execution_started = time.perf_counter()
+        documents = retrieve(retriever, question, chat_history)
+        prompt, documents = prompt_builder.build(question, chat_history, documents)
+
+        first_token_ms = None
+        llm_started = time.perf_counter()
+        for chunk in llm.stream(prompt):
+            if not chunk.content:
+                continue
+            if first_token_ms is None:
+                first_token_ms = (time.time() - start_time) * 1000
+                publish_metric("QueryTimeToFirstTokenMs", first_token_ms, unit="Milliseconds")
+                record_stage("llm_first_token", (time.perf_counter() - llm_started) * 1000)
+            yield ndjson_event("token", content=chunk.content)
+        record_stage("llm", (time.perf_counter() - llm_started) * 1000)
+        publish_metric("QueryChainExecutionMs", (time.perf_counter() - execution_started) * 1000, unit="Milliseconds")
+
+        # Headers are sent before the body, so the stage timings travel with the final event.
+        trace = current_trace()
+        yield ndjson_event("sources", sources=extract_sources(documents))
+        yield ndjson_event("done", timings=trace.timings() if trace else {})
+
+        latency_ms = (time.time() - start_time) * 1000
+        publish_metric("QueriesProcessed", 1)
+        publish_metric("QueryLatencyMs", latency_ms, unit="Milliseconds")
+
+        logger.info(f"Query {get_request_id()} streamed successfully in {latency_ms:.2f} ms")
+
+    except Exception as e:
+        logger.error(f"Error streaming /api/query-answer: {str(e)}", exc_info=True)
+        publish_metric("QueryErrors", 1)
+        yield ndjson_event("error", error="Internal Server Error")
+
+
+def answer_query(question, chat_history, k, search):
+    setup_started = time.perf_counter()
+    retriever = chains.retriever(k, search["alpha"], weaviate_filters(search))
+    llm = chains.llm()
+    publish_setup_time(setup_started)
+
+    execution_started = time.perf_counter()
+    documents = retrieve(retriever, question, chat_history)
+    prompt, documents = prompt_builder.build(question, chat_history, documents)
+
+    llm_started = time.perf_counter()
+    answer = llm.invoke(prompt).content
+    record_stage("llm", (time.perf_counter() - llm_started) * 1000)
+    publish_metric("QueryChainExecutionMs", (time.perf_counter() - execution_started) * 1000, unit="Milliseconds")
+    return answer, extract_sources(documents)
+
+
+def coalesced_stream(key, question, chat_history, k, search, start_time):
+    try:
+        yield from query_flights.stream(key, lambda: stream_answer(question, chat_history, k, search, start_time))
+    except Exception as e:
+        logger.error(f"Error in coalesced /api/query-answer stream: {str(e)}", exc_info=True)
+        publish_metric("QueryErrors", 1)
+        yield ndjson_event("error", error="Internal Server Error")
+
 
 @query_bp.route("/api/query-answer", methods=["POST"])
 def query_answer():
@@ -19,67 +175,59 @@ def query_answer():
     try:
         data = request.get_json()
         question = data.get("question", "")
-        k = int(data.get("num_sources", 3))
+        requested_k = int(data.get("num_sources", 3))
+        k = min(max(requested_k, 1), MAX_NUM_SOURCES)
         chat_history = data.get("chat_history", [])
+        stream = bool(data.get("stream", False))
 
         if not question:
             logger.warning("Missing 'question' field in request")
             return jsonify({"error": "Missing 'question'"}), 400
 
-        logger.info(f"Received query. Model: {OPENAI_MODEL}, k: {k}")
-
-        history_text = ""
-        for turn in chat_history:
-            role = turn.get("role", "")
-            content = turn.get("content", "")
-            if role and content:
-                history_text += f"{role.capitalize()}: {content}\n"
-
-        full_query = f"{history_text}User: {question}"
-
-        retriever = vectorstore.as_retriever(search_kwargs={"k": k})
-
-        prompt = PromptTemplate.from_template("""
-            You are a helpful assistant that answers questions about recent news articles.
-            Use the following context to respond. If you don't know, just say you don't know. Don't make up answers.
-            Context: {context}
-            Question: {question}
-            Answer:
-        """.strip())
-
-        llm = ChatOpenAI(
-            model=OPENAI_MODEL,
-            temperature=OPENAI_TEMPERATURE
-        )
-
-        chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            retriever=retriever,
-            chain_type="stuff",
-            chain_type_kwargs={"prompt": prompt},
-            return_source_documents=True
-        )
-
-        result = chain({"query": full_query})
-        answer = result["result"]
-        sources = [
-            doc.metadata.get("url") or doc.metadata.get("link")
-            for doc in result["source_documents"]
-            if doc.metadata.get("url") or doc.metadata.get("link")
-        ]
+        try:
+            search = parse_search_options(data)
+        except InvalidSearchOptions as e:
+            logger.warning(f"Invalid search options in request: {str(e)}")
+            return jsonify({"error": str(e)}), 400
+
+        logger.info(f"Received query {get_request_id()}. Model: {OPENAI_MODEL}, k: {k}, stream: {stream}, search: {search}")
+        if len(search) > 1:
+            publish_metric("FilteredQueries", 1)
+
+        if k != requested_k:
+            logger.info(f"Query {get_request_id()} num_sources {requested_k} clamped to {k}")
+            publish_metric("NumSourcesClamped", 1)
+
+        key = coalescing_key(question, k, chat_history, stream, search)
+
+        if stream:
+            events = (
+                coalesced_stream(key, question, chat_history, k, search, start_time) if QUERY_COALESCING_ENABLED
+                else stream_answer(question, chat_history, k, search, start_time)
+            )
+            return Response(
+                stream_with_context(events),
+                mimetype="application/x-ndjson",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+
+        if QUERY_COALESCING_ENABLED:
+            answer, sources = query_flights.do(key, lambda: answer_query(question, chat_history, k, search))
+        else:
+            answer, sources = answer_query(question, chat_history, k, search)
 
         latency_ms = (time.time() - start_time) * 1000
         publish_metric("QueriesProcessed", 1)
         publish_metric("QueryLatencyMs", latency_ms, unit="Milliseconds")
 
-        logger.info(f"Query answered successfully in {latency_ms:.2f} ms")
+        logger.info(f"Query {get_request_id()} answered successfully in {latency_ms:.2f} ms")
 
         return jsonify({
             "answer": answer,
-            "sources": list(set(sources))
+            "sources": sources
         }), 200
 
     except Exception as e:
         logger.error(f"Error in /api/query-answer: {str(e)}", exc_info=True)
         publish_metric("QueryErrors", 1)
-        return jsonify({"error": "Internal Server Error"}), 500
\ No newline at end of file
+        return jsonify({"error": "Internal Server Error"}), 500
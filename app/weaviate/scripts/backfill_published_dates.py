@@ -0,0 +1,77 @@
+"""Write the date-typed published_date property onto articles indexed before it existed.
+
+Date filters match published_date, which indexing now derives from metadata.published_at. Objects
+written earlier only have the string, so this parses it and updates each object in place; vectors
+and other properties are kept. Values that are not ISO 8601 timestamps are reported and skipped.
+If the schema has no published_date yet, it is added as a date property before the updates.
+Run from app/weaviate:
+
+    python -m scripts.backfill_published_dates --dry-run
+    python -m scripts.backfill_published_dates
+"""
+import argparse
+from weaviate.classes.config import DataType, Property
+from weaviate_client.client import client
+from config.env_loader import get_env_variable
+from utils.search_filters import PUBLISHED_PROPERTY, parse_datetime
+
+WEAVIATE_CLASS = get_env_variable("WEAVIATE_CLASS")
+
+
+def collect_updates(collection, existing):
+    updates = []
+    unparseable = []
+    scanned = 0
+    if "published_at" not in existing:
+        return updates, unparseable, scanned
+    # Weaviate rejects return properties the schema does not have, so only ask for those that exist.
+    return_properties = [name for name in ("published_at", PUBLISHED_PROPERTY) if name in existing]
+    for obj in collection.iterator(return_properties=return_properties):
+        scanned += 1
+        value = obj.properties.get("published_at")
+        if value in (None, "") or obj.properties.get(PUBLISHED_PROPERTY) is not None:
+            continue
+        published = parse_datetime(value)
+        if published is None:
+            unparseable.append((str(obj.uuid), value))
+            continue
+        updates.append((obj.uuid, published))
+    return updates, unparseable, scanned
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    args = parser.parse_args()
+
+    try:
+        collection = client.collections.get(WEAVIATE_CLASS)
+        existing = {prop.name for prop in collection.config.get().properties}
+        updates, unparseable, scanned = collect_updates(collection, existing)
+
+        for uid, value in unparseable:
+            print(f"Skipping {uid}: published_at {value!r} is not an ISO 8601 timestamp")
+        print(f"Scanned {scanned} objects: {len(updates)} to backfill, {len(unparseable)} unparseable")
+        if args.dry_run or not updates:
+            return
+
+        if PUBLISHED_PROPERTY not in existing:
+            # Added explicitly so auto-schema cannot infer a text type and break date filters.
+            collection.config.add_property(Property(name=PUBLISHED_PROPERTY, data_type=DataType.DATE))
+            print(f"Added {PUBLISHED_PROPERTY} to the {WEAVIATE_CLASS} schema")
+
+        updated = 0
+        for uid, published in updates:
+            try:
+                collection.data.update(uuid=uid, properties={PUBLISHED_PROPERTY: published})
+                updated += 1
+            except Exception as e:
+                print(f"Failed to update {uid}: {str(e)}")
+
+        print(f"Backfilled {PUBLISHED_PROPERTY} on {updated} objects")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
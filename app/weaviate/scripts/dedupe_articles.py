@@ -0,0 +1,127 @@
+"""Move articles onto object UUIDs derived from article_id and delete duplicate copies.
+
+Articles indexed before ids were derived from article_id have random UUIDs, and redelivered
+Kinesis records left several copies of the same article. For every article_id this keeps one
+copy at article_uuid(article_id), with its stored vector, and deletes the rest. Objects without
+an article_id are left alone, and nothing is done when the schema has no article_id yet. Chunks are moved onto chunk_uuid(article_id, chunk_index) when they
+are stored elsewhere (chunks indexed before chunk ids had their own namespace), and unchunked
+copies of an article that has since been chunked are deleted. Run from app/weaviate:
+
+    python -m scripts.dedupe_articles --dry-run
+    python -m scripts.dedupe_articles
+
+then set ARTICLE_ID_FILTER_FALLBACK=false on the query service.
+"""
+import argparse
+from weaviate.classes.query import Filter
+from weaviate_client.client import client
+from config.env_loader import get_env_variable
+from utils.article_ids import article_uuid, chunk_uuid
+
+WEAVIATE_CLASS = get_env_variable("WEAVIATE_CLASS")
+DELETE_BATCH_SIZE = 1000
+
+
+def collect_articles(collection):
+    groups = {}
+    chunked = set()
+    misplaced = []
+    scanned = 0
+    # Weaviate rejects return properties the schema does not have, so only ask for those that exist.
+    existing = {prop.name for prop in collection.config.get().properties}
+    if "article_id" not in existing:
+        return groups, chunked, misplaced, scanned
+    return_properties = [name for name in ("article_id", "chunk_index") if name in existing]
+    for obj in collection.iterator(return_properties=return_properties):
+        scanned += 1
+        article_id = obj.properties.get("article_id")
+        if article_id in (None, ""):
+            continue
+        chunk_index = obj.properties.get("chunk_index")
+        if chunk_index is not None:
+            chunked.add(str(article_id))
+            target = chunk_uuid(str(article_id), int(chunk_index))
+            if str(obj.uuid) != target:
+                misplaced.append((str(obj.uuid), target))
+            continue
+        groups.setdefault(str(article_id), []).append(str(obj.uuid))
+    return groups, chunked, misplaced, scanned
+
+
+def plan(groups, chunked, misplaced):
+    moves = list(misplaced)
+    deletes = [source for source, _ in misplaced]
+    for article_id, uuids in groups.items():
+        target = article_uuid(article_id)
+        if article_id in chunked:
+            deletes.extend(uid for uid in uuids if uid != target)
+            continue
+        if target in uuids:
+            deletes.extend(uid for uid in uuids if uid != target)
+            continue
+        # No copy is at the derived id yet: copy the first one there, then drop every original.
+        moves.append((uuids[0], target))
+        deletes.extend(uuids)
+    return moves, deletes
+
+
+def move_objects(collection, moves, batch_size):
+    moved = set()
+    with collection.batch.fixed_size(batch_size=batch_size) as batch:
+        for source, target in moves:
+            obj = collection.query.fetch_object_by_id(source, include_vector=True)
+            if obj is None:
+                continue
+            vector = obj.vector.get("default") if isinstance(obj.vector, dict) else obj.vector
+            batch.add_object(properties=obj.properties, uuid=target, vector=vector)
+            moved.add(source)
+
+    failed = {str(obj.original_uuid): obj.message for obj in collection.batch.failed_objects}
+    for source, target in moves:
+        if target in failed:
+            print(f"Failed to copy {source} to {target}: {failed[target]}")
+            moved.discard(source)
+    return moved
+
+
+def delete_objects(collection, uuids):
+    deleted = 0
+    for i in range(0, len(uuids), DELETE_BATCH_SIZE):
+        result = collection.data.delete_many(where=Filter.by_id().contains_any(uuids[i:i + DELETE_BATCH_SIZE]))
+        deleted += result.successful
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    parser.add_argument("--batch-size", type=int, default=100, help="objects per batch import request")
+    args = parser.parse_args()
+
+    try:
+        collection = client.collections.get(WEAVIATE_CLASS)
+        groups, chunked, misplaced, scanned = collect_articles(collection)
+        if not scanned:
+            print("Nothing to dedupe: the collection is empty or has no article_id property")
+            return
+        moves, deletes = plan(groups, chunked, misplaced)
+        duplicates = len(deletes) - len(moves)
+
+        print(f"Scanned {scanned} objects: {len(groups)} articles, {duplicates} duplicates, {len(moves)} to move onto article_id UUIDs ({len(misplaced)} of them chunks)")
+        if args.dry_run:
+            return
+
+        moved = move_objects(collection, moves, args.batch_size)
+        # Keep the originals of any article whose copy failed so nothing is lost.
+        failed_sources = {source for source, _ in moves if source not in moved}
+        failed_groups = {article_id for article_id, uuids in groups.items() if failed_sources.intersection(uuids)}
+        keep = {uid for article_id in failed_groups for uid in groups[article_id]} | failed_sources
+        deleted = delete_objects(collection, [uid for uid in deletes if uid not in keep])
+
+        print(f"Moved {len(moved)} articles and deleted {deleted} objects")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
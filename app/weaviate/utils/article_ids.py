@@ -0,0 +1,26 @@
+import uuid
+from weaviate.util import generate_uuid5
+
+# Fixed so the same article_id maps to the same object UUID in every collection and deployment.
+ARTICLE_ID_NAMESPACE = "promptwire-article"
+# Chunk ids get their own namespace so that no article_id (e.g. "x#1") can derive the id of another article's chunk.
+CHUNK_ID_NAMESPACE = "promptwire-article-chunk"
+
+
+def article_uuid(article_id):
+    """Deterministic Weaviate object UUID for an article, so writes with the same article_id overwrite each other."""
+    return generate_uuid5(str(article_id), ARTICLE_ID_NAMESPACE)
+
+
+def object_uuid(metadata):
+    article_id = (metadata or {}).get("article_id")
+    if article_id in (None, ""):
+        return str(uuid.uuid4())
+    return article_uuid(article_id)
+
+
+def chunk_uuid(article_id, chunk_index):
+    # The first chunk keeps the article's own id, so lookups and deletes by article_id start there.
+    if chunk_index == 0:
+        return article_uuid(article_id)
+    return generate_uuid5(f"{article_id}#{chunk_index}", CHUNK_ID_NAMESPACE)
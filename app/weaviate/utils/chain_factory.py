@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+import httpx
+import openai
+from langchain.prompts import PromptTemplate
+from langchain_community.chat_models import ChatOpenAI
+from config.env_loader import get_env_variable
+from utils.cloudwatch_utils import get_logger, publish_metric
+from utils.chunking import ArticleChunkRetriever
+
+OPENAI_POOL_SIZE = int(get_env_variable("OPENAI_POOL_SIZE", "20"))
+OPENAI_TIMEOUT = float(get_env_variable("OPENAI_TIMEOUT", "60"))
+
+logger = get_logger()
+
+_http_client = None
+_openai_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def _ensure_clients():
+    global _http_client, _openai_client, _client_pid
+    if _client_pid == os.getpid():
+        return
+    with _client_lock:
+        if _client_pid != os.getpid():
+            _http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=OPENAI_POOL_SIZE, max_keepalive_connections=OPENAI_POOL_SIZE),
+                timeout=OPENAI_TIMEOUT
+            )
+            _openai_client = None
+            _client_pid = os.getpid()
+
+
+def get_openai_http_client():
+    """One keep-alive connection pool per process, shared by every chat model and the embeddings client."""
+    _ensure_clients()
+    return _http_client
+
+
+def get_openai_client():
+    # ChatOpenAI would also hand an http_client to its async client, which rejects a sync one,
+    # so chat models share a prebuilt OpenAI client on top of the pool instead.
+    global _openai_client
+    _ensure_clients()
+    with _client_lock:
+        if _openai_client is None:
+            _openai_client = openai.OpenAI(http_client=_http_client)
+        return _openai_client
+
+
+class ChainFactory:
+    """Builds chat models and retrievers once per process and hands out the shared instances.
+
+    The built objects keep no per-call state (callbacks and inputs are passed per call), so concurrent
+    requests can use them at the same time.
+    """
+
+    def __init__(self, vectorstore, prompt_template, model, temperature, group_by_article=False):
+        self.vectorstore = vectorstore
+        self.group_by_article = group_by_article
+        self.prompt = PromptTemplate.from_template(prompt_template)
+        self.model = model
+        self.temperature = temperature
+        self._built = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get(self, key, build):
+        if self._pid == os.getpid():
+            built = self._built.get(key)
+            if built is not None:
+                return built
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._built = {}
+                self._pid = os.getpid()
+            built = self._built.get(key)
+            if built is None:
+                started = time.perf_counter()
+                built = build()
+                construction_ms = (time.perf_counter() - started) * 1000
+                self._built[key] = built
+                publish_metric("ChainsConstructed", 1)
+                publish_metric("ChainConstructionMs", construction_ms, unit="Milliseconds")
+                logger.info(f"[CHAINS] Built {key} in {construction_ms:.1f} ms")
+        return built
+
+    def llm(self, streaming=False, model=None, temperature=None):
+        model = model or self.model
+        temperature = self.temperature if temperature is None else temperature
+        return self._get(("llm", model, temperature, streaming), lambda: ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            streaming=streaming,
+            client=get_openai_client().chat.completions
+        ))
+
+    def _build_retriever(self, k, search_kwargs):
+        if self.group_by_article:
+            return ArticleChunkRetriever(vectorstore=self.vectorstore, k=k, search_kwargs=search_kwargs)
+        return self.vectorstore.as_retriever(search_kwargs={"k": k, **search_kwargs})
+
+    def retriever(self, k, alpha, filters=None):
+        if filters is not None:
+            # Filters differ from request to request, so filtered retrievers are cheap one-offs rather than cached.
+            return self._build_retriever(k, {"alpha": alpha, "filters": filters})
+        return self._get(("retriever", k, alpha), lambda: self._build_retriever(k, {"alpha": alpha}))
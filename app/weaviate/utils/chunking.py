@@ -0,0 +1,90 @@
+from typing import Any, Dict
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from utils.tokens import token_offsets
+
+# Properties written on every chunk besides the article's own metadata.
+CHUNK_PROPERTIES = ("chunk_index", "chunk_count", "chunk_start", "chunk_end")
+PASSAGE_SEPARATOR = "\n...\n"
+
+
+def chunk_text(text, chunk_tokens, overlap_tokens):
+    """Split text into windows of chunk_tokens tokens, each overlapping the previous by overlap_tokens.
+
+    Returns dicts with the chunk text and its start/end character offsets in text.
+    """
+    offsets = token_offsets(text)
+    step = max(1, chunk_tokens - overlap_tokens)
+    chunks = []
+
+    for first in range(0, max(1, len(offsets)), step):
+        last = first + chunk_tokens
+        start = offsets[first] if offsets else 0
+        end = offsets[last] if last < len(offsets) else len(text)
+
+        # Trim the whitespace tokens carry at their edges, keeping the offsets exact.
+        piece = text[start:end]
+        start += len(piece) - len(piece.lstrip())
+        end -= len(piece) - len(piece.rstrip())
+        if end > start:
+            chunks.append({"text": text[start:end], "start": start, "end": end})
+
+        if last >= len(offsets):
+            break
+
+    return chunks
+
+
+def article_key(document):
+    metadata = document.metadata
+    return metadata.get("article_id") or metadata.get("url") or metadata.get("link") or id(document)
+
+
+def merge_passages(chunks):
+    """Join one article's chunks in document order, dropping the text adjacent chunks overlap on."""
+    chunks = sorted(chunks, key=lambda doc: doc.metadata.get("chunk_index", 0))
+    text = chunks[0].page_content
+    previous = chunks[0].metadata
+
+    for chunk in chunks[1:]:
+        metadata = chunk.metadata
+        adjacent = metadata.get("chunk_index") == previous.get("chunk_index", -2) + 1
+        overlap = previous.get("chunk_end", 0) - metadata.get("chunk_start", 0)
+        if adjacent:
+            text += chunk.page_content[overlap:] if overlap > 0 else " " + chunk.page_content
+        else:
+            text += PASSAGE_SEPARATOR + chunk.page_content
+        previous = metadata
+
+    return text
+
+
+def group_by_article(documents):
+    """Collapse retrieved chunks into one document per article, ordered by each article's best-ranked chunk."""
+    groups = {}
+    for document in documents:
+        groups.setdefault(article_key(document), []).append(document)
+
+    grouped = []
+    for chunks in groups.values():
+        metadata = {key: value for key, value in chunks[0].metadata.items() if key not in CHUNK_PROPERTIES}
+        if any("chunk_index" in chunk.metadata for chunk in chunks):
+            metadata["chunks"] = sorted(chunk.metadata.get("chunk_index", 0) for chunk in chunks)
+        grouped.append(Document(page_content=merge_passages(chunks), metadata=metadata))
+    return grouped
+
+
+class ArticleChunkRetriever(BaseRetriever):
+    """Retrieves the k best-matching chunks and returns them grouped by article.
+
+    Each returned document holds only the matched passages of one article, so prompts carry
+    the relevant text rather than whole articles, and sources stay attributed to the article.
+    """
+
+    vectorstore: Any
+    k: int = 4
+    search_kwargs: Dict[str, Any] = {}
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        return group_by_article(self.vectorstore.similarity_search(query, k=self.k, **self.search_kwargs))
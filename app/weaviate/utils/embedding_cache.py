@@ -0,0 +1,183 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+from utils.cloudwatch_utils import get_logger, publish_metric
+
+logger = get_logger()
+
+# SQLite limits the number of bound parameters per statement.
+SQLITE_LOOKUP_BATCH = 500
+# How many new disk entries to write between checks of the on-disk size limit.
+PRUNE_EVERY = 1000
+
+
+def model_version(embeddings, version):
+    model = getattr(embeddings, "model", None) or type(embeddings).__name__
+    dimensions = getattr(embeddings, "dimensions", None)
+    return f"{model}:{dimensions or 'default'}:{version}"
+
+
+class CachedEmbeddings(Embeddings):
+    """Content-hash keyed embedding cache: an in-memory LRU in front of a SQLite file.
+
+    Keys are SHA-256 of the model version, the call kind and the text, so changing the model (or
+    bumping the cache version) never serves vectors from another embedding space. Vectors are stored
+    on disk as float32, and the least recently used entries are evicted past max_disk_entries.
+    """
+
+    def __init__(self, embeddings, version, db_path, memory_size=10000, max_disk_entries=200000):
+        self.embeddings = embeddings
+        self.version = model_version(embeddings, version)
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._local = threading.local()
+        self._writes_since_prune = 0
+        self._disk_enabled = bool(db_path)
+
+    def _key(self, kind, text):
+        # Queries and documents are keyed apart since a model may embed them differently.
+        return hashlib.sha256(f"{self.version}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared across threads or forks.
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=5)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        connection.commit()
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def _memory_get(self, key):
+        with self._memory_lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+            return vector
+
+    def _memory_put(self, key, vector):
+        with self._memory_lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, keys):
+        if not self._disk_enabled or not keys:
+            return {}
+
+        found = {}
+        try:
+            connection = self._connection()
+            for i in range(0, len(keys), SQLITE_LOOKUP_BATCH):
+                batch = keys[i:i + SQLITE_LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update((key, array("f", vector).tolist()) for key, vector in rows)
+
+            if found:
+                now = time.time()
+                connection.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+                connection.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"[EMBED CACHE] Disk lookup failed: {str(e)}")
+            publish_metric("EmbeddingCacheDiskErrors", 1)
+        return found
+
+    def _disk_put(self, entries):
+        if not self._disk_enabled or not entries:
+            return
+
+        try:
+            connection = self._connection()
+            now = time.time()
+            connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(key, self.version, array("f", vector).tobytes(), now) for key, vector in entries.items()]
+            )
+            connection.commit()
+
+            self._writes_since_prune += len(entries)
+            if self._writes_since_prune >= PRUNE_EVERY:
+                self._writes_since_prune = 0
+                self._prune(connection)
+        except sqlite3.Error as e:
+            logger.warning(f"[EMBED CACHE] Disk write failed: {str(e)}")
+            publish_metric("EmbeddingCacheDiskErrors", 1)
+
+    def _prune(self, connection):
+        count = connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess <= 0:
+            return
+        connection.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        connection.commit()
+        publish_metric("EmbeddingCacheEvictions", excess)
+
+    def _lookup(self, kind, texts, compute):
+        keys = [self._key(kind, text) for text in texts]
+        vectors = {}
+
+        for key in set(keys):
+            vector = self._memory_get(key)
+            if vector is not None:
+                vectors[key] = vector
+        memory_hits = len(vectors)
+
+        disk_hits = self._disk_get([key for key in set(keys) if key not in vectors])
+        for key, vector in disk_hits.items():
+            self._memory_put(key, vector)
+        vectors.update(disk_hits)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        if missing:
+            computed = compute(list(missing.values()))
+            fresh = dict(zip(missing.keys(), computed))
+            for key, vector in fresh.items():
+                self._memory_put(key, vector)
+            self._disk_put(fresh)
+            vectors.update(fresh)
+
+        lookups = memory_hits + len(disk_hits) + len(missing)
+        publish_metric("EmbeddingCacheMemoryHits", memory_hits)
+        publish_metric("EmbeddingCacheDiskHits", len(disk_hits))
+        publish_metric("EmbeddingCacheMisses", len(missing))
+        if lookups:
+            publish_metric("EmbeddingCacheHitRate", 100 * (lookups - len(missing)) / lookups, unit="Percent")
+
+        return [vectors[key] for key in keys]
+
+    def embed_documents(self, texts):
+        return self._lookup("document", list(texts), self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        return self._lookup("query", [text], lambda texts: [self.embeddings.embed_query(texts[0])])[0]
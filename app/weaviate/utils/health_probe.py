@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from config.env_loader import get_env_variable
+from utils.cloudwatch_utils import get_logger, publish_metric
+
+HEALTH_PROBE_INTERVAL = float(get_env_variable("HEALTH_PROBE_INTERVAL", "15"))
+# A snapshot older than this means the prober thread is stuck or dead, so it is reported as unhealthy.
+HEALTH_MAX_AGE = float(get_env_variable("HEALTH_MAX_AGE", str(HEALTH_PROBE_INTERVAL * 3)))
+
+logger = get_logger()
+
+
+class HealthProber:
+    """Refreshes dependency checks on a background thread so /health can serve a cached snapshot.
+
+    Each check is a callable that raises (or returns False) when its dependency is unhealthy.
+    """
+
+    def __init__(self, checks, metric_name, interval=HEALTH_PROBE_INTERVAL, max_age=HEALTH_MAX_AGE):
+        self.checks = checks
+        self.metric_name = metric_name
+        self.interval = interval
+        self.max_age = max_age
+        self._snapshot = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def probe(self):
+        dependencies = {}
+
+        for name, check in self.checks.items():
+            start_time = time.time()
+            try:
+                healthy = check() is not False
+                error = None if healthy else "check returned False"
+            except Exception as e:
+                healthy = False
+                error = str(e)
+
+            dependencies[name] = {
+                "healthy": healthy,
+                "latency_ms": round((time.time() - start_time) * 1000, 2),
+                "error": error
+            }
+
+        healthy = all(dep["healthy"] for dep in dependencies.values())
+        snapshot = {
+            "status": "healthy" if healthy else "unhealthy",
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "dependencies": dependencies,
+            "_checked": time.time()
+        }
+
+        with self._lock:
+            self._snapshot = snapshot
+        self._ready.set()
+
+        if not healthy:
+            logger.error(f"[HEALTH] Dependency check failed: {dependencies}")
+        publish_metric(self.metric_name, 1 if healthy else 0)
+        return snapshot
+
+    def snapshot(self):
+        self._ensure_started()
+        # Until the prober thread's first pass lands, wait for it rather than probing alongside it.
+        self._ready.wait(timeout=self.interval)
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None:
+            return {"status": "unhealthy", "checked_at": None, "dependencies": {}, "age_seconds": None, "error": "first probe has not finished"}
+
+        result = {k: v for k, v in snapshot.items() if not k.startswith("_")}
+        age = time.time() - snapshot["_checked"]
+        result["age_seconds"] = round(age, 3)
+        if age > self.max_age:
+            result["status"] = "unhealthy"
+            result["error"] = f"snapshot is older than {self.max_age:g} seconds"
+        return result
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="promptwire-health", daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                self.probe()
+            except Exception as e:
+                logger.error(f"[HEALTH] Prober error: {str(e)}", exc_info=True)
+            time.sleep(self.interval)
@@ -0,0 +1,32 @@
+import functools
+import threading
+import uuid
+
+# Per-process state: the generation changes on every index or delete request this process serves, and the
+# process id tells the API server's poller which process answered, so several processes behind one URL
+# are tracked separately instead of looking like a version that changes on every poll.
+_process_id = uuid.uuid4().hex[:8]
+_generation = 0
+_lock = threading.Lock()
+
+
+def current_version() -> dict:
+    with _lock:
+        return {"process": _process_id, "generation": _generation, "version": f"{_process_id}-{_generation}"}
+
+
+def bump():
+    global _generation
+    with _lock:
+        _generation += 1
+
+
+def bumps_index_version(view):
+    """Bump the index version after the view runs, whether or not it succeeded (a failed batch may be partly written)."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            return view(*args, **kwargs)
+        finally:
+            bump()
+    return wrapper
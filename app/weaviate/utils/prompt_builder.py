@@ -0,0 +1,104 @@
+from utils.cloudwatch_utils import publish_histogram, publish_metric
+from utils.tokens import count_tokens, token_offsets
+
+CONTEXT_SEPARATOR = "\n\n"
+# A document cut to fewer tokens than this adds little beyond noise, so it is dropped instead.
+MIN_DOCUMENT_TOKENS = 50
+
+
+def truncate_tokens(text, max_tokens):
+    if max_tokens <= 0:
+        return ""
+    offsets = token_offsets(text)
+    if len(offsets) <= max_tokens:
+        return text
+    return text[:offsets[max_tokens]].rstrip()
+
+
+def history_turns(question, chat_history):
+    """Formatted "Role: content" turns, oldest first.
+
+    /chat stores the question before reading recent history, so a trailing user turn equal to
+    the question is dropped rather than repeated.
+    """
+    history = list(chat_history or [])
+    if history and history[-1].get("role") == "user" and history[-1].get("content") == question:
+        history = history[:-1]
+
+    return [
+        f"{turn['role'].capitalize()}: {turn['content']}"
+        for turn in history
+        if turn.get("role") and turn.get("content")
+    ]
+
+
+class PromptBuilder:
+    """Assembles the answer prompt from retrieved documents, chat history and the question within a token budget.
+
+    The question is kept (cut to question_tokens if needed), then the most recent history turns up
+    to history_tokens, and retrieved documents fill what is left in rank order; the last one that
+    fits only partly is truncated.
+    """
+
+    def __init__(self, prompt, max_tokens, history_tokens, question_tokens):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.history_tokens = history_tokens
+        self.question_tokens = question_tokens
+        self.template_tokens = count_tokens(prompt.format(context="", question=""))
+
+    def _fit_history(self, turns, budget):
+        kept = []
+        used = 0
+        for turn in reversed(turns):
+            # Each turn also costs the newline joining it to the next.
+            tokens = count_tokens(turn) + 1
+            if used + tokens > budget:
+                if not kept:
+                    turn = truncate_tokens(turn, budget - 1)
+                    if turn:
+                        kept.append(turn)
+                break
+            kept.append(turn)
+            used += tokens
+        return list(reversed(kept))
+
+    def _fit_documents(self, documents, budget):
+        kept = []
+        texts = []
+        separator_tokens = count_tokens(CONTEXT_SEPARATOR)
+        for document in documents:
+            available = budget - (separator_tokens if texts else 0)
+            tokens = count_tokens(document.page_content)
+            if tokens <= available:
+                text = document.page_content
+            elif available >= MIN_DOCUMENT_TOKENS:
+                text = truncate_tokens(document.page_content, available)
+                publish_metric("PromptDocumentsTruncated", 1)
+            else:
+                break
+            kept.append(document)
+            texts.append(text)
+            budget = available - min(tokens, available)
+        return kept, CONTEXT_SEPARATOR.join(texts)
+
+    def build(self, question, chat_history, documents):
+        """Return the prompt text and the documents it actually includes."""
+        question_line = f"User: {truncate_tokens(question, self.question_tokens)}"
+        remaining = self.max_tokens - self.template_tokens - count_tokens(question_line)
+
+        turns = history_turns(question, chat_history)
+        kept_turns = self._fit_history(turns, min(self.history_tokens, max(0, remaining)))
+        question_text = "\n".join(kept_turns + [question_line])
+        remaining = self.max_tokens - self.template_tokens - count_tokens(question_text)
+
+        kept_documents, context = self._fit_documents(documents, max(0, remaining))
+        prompt = self.prompt.format(context=context, question=question_text)
+
+        publish_histogram("PromptTokens", count_tokens(prompt), unit="Count")
+        if len(kept_turns) < len(turns):
+            publish_metric("PromptHistoryTurnsDropped", len(turns) - len(kept_turns))
+        if len(kept_documents) < len(documents):
+            publish_metric("PromptDocumentsDropped", len(documents) - len(kept_documents))
+
+        return prompt, kept_documents
@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+from weaviate.classes.query import Filter
+from config.env_loader import get_env_variable
+from utils.cloudwatch_utils import get_logger, publish_metric
+
+# Weight of the vector score against BM25 in hybrid search: 1.0 is pure vector search, 0.0 pure keyword.
+SEARCH_ALPHA = float(get_env_variable("SEARCH_ALPHA", "0.7"))
+MAX_SOURCE_FILTERS = int(get_env_variable("MAX_SOURCE_FILTERS", "20"))
+
+# Date-typed copy of published_at written at index time, so date windows are range filters in Weaviate.
+PUBLISHED_PROPERTY = "published_date"
+SOURCE_PROPERTY = "source"
+
+logger = get_logger()
+
+
+class InvalidSearchOptions(ValueError):
+    pass
+
+
+def parse_datetime(value):
+    """Parse an ISO 8601 timestamp, treating ones without an offset as UTC. Returns None if it is not one."""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_published(metadata):
+    """Parse an article's published_at for PUBLISHED_PROPERTY, logging and counting values that are not timestamps."""
+    value = metadata.get("published_at")
+    if value in (None, ""):
+        return None
+    published = parse_datetime(value)
+    if published is None:
+        logger.warning(f"Unparseable published_at {value!r} on article {metadata.get('article_id')}; it will not match date filters")
+        publish_metric("PublishedAtUnparseable", 1)
+    return published
+
+
+def is_unknown_property_error(error):
+    # Weaviate rejects filters on properties no object in the class has stored yet; langchain-weaviate re-raises it as ValueError.
+    return "no such prop with name" in str(error)
+
+
+def parse_search_options(data):
+    """Validate alpha and filters from a query request into a normalized, JSON-serializable dict."""
+    alpha = data.get("alpha", SEARCH_ALPHA)
+    if isinstance(alpha, bool) or not isinstance(alpha, (int, float)) or not 0 <= alpha <= 1:
+        raise InvalidSearchOptions("'alpha' must be a number between 0 and 1")
+    options = {"alpha": float(alpha)}
+
+    filters = data.get("filters") or {}
+    if not isinstance(filters, dict):
+        raise InvalidSearchOptions("'filters' must be an object")
+
+    for field in ("published_after", "published_before"):
+        if filters.get(field) is None:
+            continue
+        parsed = parse_datetime(filters[field])
+        if parsed is None:
+            raise InvalidSearchOptions(f"'filters.{field}' must be an ISO 8601 timestamp")
+        options[field] = parsed.astimezone(timezone.utc).isoformat()
+
+    if "published_after" in options and "published_before" in options \
+            and options["published_after"] > options["published_before"]:
+        raise InvalidSearchOptions("'filters.published_after' must not be later than 'filters.published_before'")
+
+    sources = filters.get("sources")
+    if sources is not None:
+        if isinstance(sources, str):
+            sources = [sources]
+        if not isinstance(sources, list) or not all(isinstance(source, str) and source for source in sources):
+            raise InvalidSearchOptions("'filters.sources' must be a list of source names")
+        if len(sources) > MAX_SOURCE_FILTERS:
+            raise InvalidSearchOptions(f"At most {MAX_SOURCE_FILTERS} sources can be filtered on")
+        if sources:
+            options["sources"] = sorted(set(sources))
+
+    return options
+
+
+def weaviate_filters(options):
+    """Build the Weaviate filter for parsed search options, or None when they do not filter."""
+    conditions = []
+    if "published_after" in options:
+        conditions.append(Filter.by_property(PUBLISHED_PROPERTY).greater_or_equal(datetime.fromisoformat(options["published_after"])))
+    if "published_before" in options:
+        conditions.append(Filter.by_property(PUBLISHED_PROPERTY).less_or_equal(datetime.fromisoformat(options["published_before"])))
+    if "sources" in options:
+        conditions.append(Filter.any_of([Filter.by_property(SOURCE_PROPERTY).equal(source) for source in options["sources"]]))
+
+    if not conditions:
+        return None
+    return Filter.all_of(conditions)
@@ -0,0 +1,147 @@
+import threading
+import time
+from utils.cloudwatch_utils import get_logger, publish_metric
+from utils.tracing import record_stage
+
+logger = get_logger()
+
+
+class _Flight:
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self.events = []
+        self.finished = False
+        self.followers = 0
+        self.condition = threading.Condition()
+
+
+class SingleFlight:
+    """Collapses concurrent calls that share a key into one execution whose result every caller receives.
+
+    The first caller for a key runs the work; callers arriving while it is in flight wait for its
+    result (or, for streams, replay its events as they are produced) instead of repeating it.
+    Followers that wait longer than wait_timeout give up on the shared call and run their own.
+    """
+
+    def __init__(self, name, wait_timeout=60):
+        self.name = name
+        self.wait_timeout = wait_timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                return flight, True
+            flight.followers += 1
+
+        publish_metric(f"{self.name}Coalesced", 1)
+        return flight, False
+
+    def _release(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _finish(self, key, flight):
+        self._release(key, flight)
+        with flight.condition:
+            flight.finished = True
+            flight.condition.notify_all()
+
+        publish_metric(f"{self.name}Executions", 1)
+        if flight.followers:
+            publish_metric(f"{self.name}CoalescedPerExecution", flight.followers)
+
+    def _timed_out(self, key):
+        logger.warning(f"[COALESCE] {self.name} follower gave up waiting on {key} after {self.wait_timeout}s")
+        publish_metric(f"{self.name}CoalesceTimeouts", 1)
+
+    def do(self, key, fn):
+        flight, leader = self._join(key)
+
+        if leader:
+            try:
+                flight.result = fn()
+            except Exception as e:
+                flight.error = e
+                raise
+            finally:
+                self._finish(key, flight)
+            return flight.result
+
+        started = time.perf_counter()
+        with flight.condition:
+            finished = flight.condition.wait_for(lambda: flight.finished, timeout=self.wait_timeout)
+        record_stage("coalesced_wait", (time.perf_counter() - started) * 1000)
+
+        if not finished:
+            self._timed_out(key)
+            return fn()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stream(self, key, fn):
+        """Yield the events of fn() (a generator), shared with concurrent callers using the same key."""
+        flight, leader = self._join(key)
+
+        if not leader:
+            yield from self._follow(key, flight, fn)
+            return
+
+        source = fn()
+        try:
+            for event in source:
+                with flight.condition:
+                    flight.events.append(event)
+                    flight.condition.notify_all()
+                yield event
+        except GeneratorExit:
+            # The leader's client went away; finish producing the stream for anyone replaying it.
+            self._release(key, flight)
+            if flight.followers:
+                for event in source:
+                    with flight.condition:
+                        flight.events.append(event)
+                        flight.condition.notify_all()
+            raise
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            self._finish(key, flight)
+
+    def _follow(self, key, flight, fn):
+        started = time.perf_counter()
+        index = 0
+
+        while True:
+            with flight.condition:
+                ready = flight.condition.wait_for(
+                    lambda: len(flight.events) > index or flight.finished,
+                    timeout=self.wait_timeout
+                )
+                events = flight.events[index:]
+                finished = flight.finished
+
+            if index == 0 and (events or finished):
+                record_stage("coalesced_wait", (time.perf_counter() - started) * 1000)
+
+            if not ready:
+                self._timed_out(key)
+                if index == 0:
+                    yield from fn()
+                    return
+                raise TimeoutError(f"{self.name} shared stream stalled")
+
+            index += len(events)
+            yield from events
+
+            if finished and index == len(flight.events):
+                if flight.error is not None:
+                    raise flight.error
+                return
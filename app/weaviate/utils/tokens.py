@@ -0,0 +1,49 @@
+import re
+import threading
+import tiktoken
+from config.env_loader import get_env_variable
+from utils.cloudwatch_utils import get_logger, publish_metric
+
+logger = get_logger()
+
+# The encoding shared by the OpenAI embedding and chat models this service uses.
+TOKENIZER_ENCODING = get_env_variable("TOKENIZER_ENCODING", "cl100k_base")
+
+# Used when the tokenizer files cannot be loaded: word pieces of up to four characters, which
+# slightly overcounts real BPE tokens so budgets built on it stay on the safe side.
+APPROXIMATE_TOKEN = re.compile(r"\w{1,4}|[^\w\s]")
+
+_encoding = None
+_loaded = False
+_lock = threading.Lock()
+
+
+def get_encoding():
+    global _encoding, _loaded
+    if _loaded:
+        return _encoding
+    with _lock:
+        if not _loaded:
+            try:
+                _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+            except Exception as e:
+                logger.warning(f"[TOKENS] Could not load {TOKENIZER_ENCODING}, using approximate token counts: {str(e)}")
+                publish_metric("TokenizerFallbacks", 1)
+            _loaded = True
+    return _encoding
+
+
+def count_tokens(text):
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(APPROXIMATE_TOKEN.findall(text))
+
+
+def token_offsets(text):
+    """Character offset at which each token of text starts."""
+    encoding = get_encoding()
+    if encoding is not None:
+        _, offsets = encoding.decode_with_offsets(encoding.encode(text, disallowed_special=()))
+        return offsets
+    return [match.start() for match in APPROXIMATE_TOKEN.finditer(text)]
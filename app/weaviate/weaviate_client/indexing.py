@@ -0,0 +1,179 @@
+import uuid
+from weaviate.classes.query import Filter
+from weaviate_client.client import client
+from weaviate_client.vectorstore import embedding
+from config.env_loader import get_env_variable
+from utils.cloudwatch_utils import get_logger, publish_metric
+from utils.article_ids import chunk_uuid
+from utils.chunking import chunk_text
+from utils.search_filters import PUBLISHED_PROPERTY, parse_published
+
+logger = get_logger()
+
+WEAVIATE_CLASS = get_env_variable("WEAVIATE_CLASS")
+# Each embedding request carries at most this many texts and characters (roughly 4 characters per token).
+INDEX_EMBED_BATCH_SIZE = int(get_env_variable("INDEX_EMBED_BATCH_SIZE", "100"))
+INDEX_EMBED_BATCH_CHARS = int(get_env_variable("INDEX_EMBED_BATCH_CHARS", "400000"))
+INDEX_BATCH_SIZE = int(get_env_variable("INDEX_BATCH_SIZE", "100"))
+INDEX_CONCURRENT_REQUESTS = int(get_env_variable("INDEX_CONCURRENT_REQUESTS", "4"))
+CHUNKING_ENABLED = get_env_variable("CHUNKING_ENABLED", "true").lower() == "true"
+CHUNK_SIZE_TOKENS = int(get_env_variable("CHUNK_SIZE_TOKENS", "512"))
+CHUNK_OVERLAP_TOKENS = int(get_env_variable("CHUNK_OVERLAP_TOKENS", "64"))
+# Ids per filter when looking up or deleting chunks by id.
+ID_BATCH_SIZE = 1000
+
+
+def embedding_batches(chunks):
+    batch = []
+    chars = 0
+    for chunk in chunks:
+        length = len(chunk["page_content"])
+        if batch and (len(batch) >= INDEX_EMBED_BATCH_SIZE or chars + length > INDEX_EMBED_BATCH_CHARS):
+            yield batch
+            batch, chars = [], 0
+        batch.append(chunk)
+        chars += length
+    if batch:
+        yield batch
+
+
+def split_article(index, article_id, page_content, metadata):
+    if CHUNKING_ENABLED:
+        pieces = chunk_text(page_content, CHUNK_SIZE_TOKENS, CHUNK_OVERLAP_TOKENS)
+    else:
+        pieces = [{"text": page_content, "start": 0, "end": len(page_content)}]
+
+    return [{
+        "index": index,
+        "id": chunk_uuid(article_id, chunk_index),
+        "page_content": piece["text"],
+        "properties": {
+            **metadata,
+            "article_id": article_id,
+            "chunk_index": chunk_index,
+            "chunk_count": len(pieces),
+            "chunk_start": piece["start"],
+            "chunk_end": piece["end"]
+        }
+    } for chunk_index, piece in enumerate(pieces)]
+
+
+def prepare_articles(articles):
+    """Validate and chunk raw articles into the objects to import, with one pending result per article."""
+    chunks = []
+    results = []
+    for index, article in enumerate(articles):
+        if not isinstance(article, dict) or not article.get("page_content"):
+            results.append({"index": index, "status": "failed", "error": "Missing page_content"})
+            continue
+        metadata = article.get("metadata") or {}
+        if not isinstance(metadata, dict):
+            results.append({"index": index, "status": "failed", "error": "metadata must be an object"})
+            continue
+
+        # Chunks are grouped back together by article_id, so articles without one get a fresh id.
+        article_id = metadata.get("article_id")
+        if article_id in (None, ""):
+            article_id = str(uuid.uuid4())
+
+        published = parse_published(metadata)
+        if published is not None:
+            metadata = {**metadata, PUBLISHED_PROPERTY: published}
+
+        pieces = split_article(index, article_id, article["page_content"], metadata)
+        chunks.extend(pieces)
+        results.append({
+            "index": index,
+            "status": "pending",
+            "id": pieces[0]["id"],
+            "article_id": article_id,
+            "chunks": len(pieces)
+        })
+    return chunks, results
+
+
+def previous_chunk_counts(collection, results):
+    # Read before importing, since the import overwrites the first chunk's chunk_count.
+    ids = [result["id"] for result in results if result["status"] == "pending"]
+    counts = {}
+    for i in range(0, len(ids), ID_BATCH_SIZE):
+        batch = ids[i:i + ID_BATCH_SIZE]
+        response = collection.query.fetch_objects(
+            filters=Filter.by_id().contains_any(batch),
+            limit=len(batch),
+            return_properties=["chunk_count"]
+        )
+        for obj in response.objects:
+            counts[str(obj.uuid)] = obj.properties.get("chunk_count") or 1
+    return counts
+
+
+def import_chunks(collection, chunks, results):
+    # Objects are handed to the batch importer as each embedding batch completes, so its
+    # background requests to Weaviate overlap with the next embedding call.
+    with collection.batch.fixed_size(batch_size=INDEX_BATCH_SIZE, concurrent_requests=INDEX_CONCURRENT_REQUESTS) as batch:
+        for embed_batch in embedding_batches(chunks):
+            try:
+                vectors = embedding.embed_documents([chunk["page_content"] for chunk in embed_batch])
+            except Exception as e:
+                logger.error(f"Failed to embed {len(embed_batch)} chunks: {str(e)}", exc_info=True)
+                publish_metric("IndexEmbeddingErrors", 1)
+                for chunk in embed_batch:
+                    results[chunk["index"]].update(status="failed", error="Embedding failed")
+                continue
+
+            for chunk, vector in zip(embed_batch, vectors):
+                batch.add_object(
+                    # Metadata first, so a "page_content" key in it cannot replace the chunk text.
+                    properties={**chunk["properties"], "page_content": chunk["page_content"]},
+                    uuid=chunk["id"],
+                    vector=vector
+                )
+
+    failed = {str(obj.original_uuid): obj.message for obj in collection.batch.failed_objects}
+    for chunk in chunks:
+        if chunk["id"] in failed and results[chunk["index"]]["status"] == "pending":
+            results[chunk["index"]].update(status="failed", error=failed[chunk["id"]])
+
+    for result in results:
+        if result["status"] == "pending":
+            result["status"] = "success"
+
+
+def delete_chunks(collection, ids):
+    deleted = 0
+    for i in range(0, len(ids), ID_BATCH_SIZE):
+        response = collection.data.delete_many(where=Filter.by_id().contains_any(ids[i:i + ID_BATCH_SIZE]))
+        deleted += response.successful
+    return deleted
+
+
+def delete_stale_chunks(collection, results, previous_counts):
+    # An article re-indexed into fewer chunks would otherwise keep its old trailing chunks.
+    stale = []
+    for result in results:
+        if result["status"] == "success":
+            previous = previous_counts.get(result["id"], 0)
+            stale.extend(chunk_uuid(result["article_id"], i) for i in range(result["chunks"], previous))
+
+    if stale:
+        try:
+            publish_metric("StaleChunksDeleted", delete_chunks(collection, stale))
+        except Exception as e:
+            logger.warning(f"Failed to delete {len(stale)} stale chunks: {str(e)}")
+            publish_metric("StaleChunkDeleteErrors", 1)
+
+
+def index_documents(articles):
+    """Chunk, embed and import articles, returning a status per article."""
+    chunks, results = prepare_articles(articles)
+    if not chunks:
+        return results
+
+    collection = client.collections.get(WEAVIATE_CLASS)
+    previous_counts = previous_chunk_counts(collection, results)
+    import_chunks(collection, chunks, results)
+    delete_stale_chunks(collection, results, previous_counts)
+
+    publish_metric("ChunksIndexed", sum(result["chunks"] for result in results if result["status"] == "success"))
+    return results
@@ -2,9 +2,30 @@ from langchain_openai import OpenAIEmbeddings
 from langchain_weaviate import WeaviateVectorStore
 from config.env_loader import get_env_variable
 from weaviate_client.client import client
+from utils.tracing import TimedEmbeddings
+from utils.chain_factory import get_openai_http_client
+from utils.embedding_cache import CachedEmbeddings
 
-embedding = OpenAIEmbeddings()
 WEAVIATE_CLASS = get_env_variable("WEAVIATE_CLASS")
+EMBEDDING_CACHE_ENABLED = get_env_variable("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+# An empty path keeps the cache in memory only.
+EMBEDDING_CACHE_PATH = get_env_variable("EMBEDDING_CACHE_PATH", "/tmp/promptwire/embedding_cache.sqlite3")
+EMBEDDING_CACHE_MEMORY_SIZE = int(get_env_variable("EMBEDDING_CACHE_MEMORY_SIZE", "10000"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(get_env_variable("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+# Bump to invalidate every cached vector without changing the model.
+EMBEDDING_CACHE_VERSION = get_env_variable("EMBEDDING_CACHE_VERSION", "1")
+
+base_embedding = OpenAIEmbeddings(http_client=get_openai_http_client())
+if EMBEDDING_CACHE_ENABLED:
+    base_embedding = CachedEmbeddings(
+        base_embedding,
+        EMBEDDING_CACHE_VERSION,
+        EMBEDDING_CACHE_PATH,
+        memory_size=EMBEDDING_CACHE_MEMORY_SIZE,
+        max_disk_entries=EMBEDDING_CACHE_MAX_ENTRIES
+    )
+
+embedding = TimedEmbeddings(base_embedding)
 
 vectorstore = WeaviateVectorStore(
     client=client,
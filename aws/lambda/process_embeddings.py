@@ -1,3 +1,4 @@
+import os
 import json
 import base64
 import boto3
@@ -5,16 +6,45 @@ import requests
 
 secrets_client = boto3.client("secretsmanager")
 SECRETS_NAME = "PromptWireSecrets"
+# Must not exceed the query service's INDEX_MAX_ARTICLES, which rejects larger requests outright.
+INDEX_MAX_ARTICLES = int(os.environ.get("INDEX_MAX_ARTICLES", 1000))
 
 def get_secrets():
     response = secrets_client.get_secret_value(SecretId=SECRETS_NAME)
     secrets = json.loads(response["SecretString"])
     return secrets["flask_api_url"]
 
+def index_chunk(endpoint, articles, sequence_numbers):
+    """Post one request's worth of articles; returns the sequence numbers of the records that failed."""
+    try:
+        response = requests.post(endpoint, json={"articles": articles}, timeout=60)
+    except requests.RequestException as e:
+        print(f"[FAILED] Bulk index of {len(articles)} articles - {str(e)}")
+        return list(sequence_numbers)
+
+    if response.status_code != 200:
+        print(f"[FAILED] Bulk index of {len(articles)} articles - {response.status_code}: {response.text}")
+        return list(sequence_numbers)
+
+    failed = []
+    body = response.json()
+    for result in body["results"]:
+        title = articles[result["index"]]["metadata"].get("title")
+        if result["status"] == "success":
+            print(f"[SUCCESS] Indexed: {title}")
+        else:
+            print(f"[FAILED] {title} - {result.get('error')}")
+            failed.append(sequence_numbers[result["index"]])
+    print(f"Indexed {body['indexed']} articles at {body['docs_per_second']} docs/sec")
+    return failed
+
 def lambda_handler(event, context):
     try:
         base_url = get_secrets()
-        endpoint = f"{base_url}/index-article"
+        endpoint = f"{base_url}/index-articles"
+
+        articles = []
+        sequence_numbers = []
 
         for record in event["Records"]:
             payload = json.loads(base64.b64decode(record["kinesis"]["data"]))
@@ -26,25 +56,26 @@ def lambda_handler(event, context):
                 print("Skipping: empty page_content")
                 continue
 
-            response = requests.post(
-                endpoint,
-                json={"page_content": page_content, "metadata": metadata},
-                timeout=10
-            )
+            articles.append({"page_content": page_content, "metadata": metadata})
+            sequence_numbers.append(record["kinesis"]["sequenceNumber"])
+
+        batch_item_failures = []
 
-            if response.status_code != 200:
-                print(f"[FAILED] {metadata.get('title')} - {response.status_code}: {response.text}")
-            else:
-                print(f"[SUCCESS] Indexed: {metadata.get('title')}")
+        # Result indexes are relative to each request, so sequence numbers are sliced alongside the articles.
+        for start in range(0, len(articles), INDEX_MAX_ARTICLES):
+            end = start + INDEX_MAX_ARTICLES
+            failed = index_chunk(endpoint, articles[start:end], sequence_numbers[start:end])
+            batch_item_failures.extend({"itemIdentifier": seq} for seq in failed)
 
+        # With ReportBatchItemFailures enabled on the event source mapping, only these records are retried.
         return {
             "statusCode": 200,
-            "body": json.dumps("All records processed.")
+            "body": json.dumps("All records processed."),
+            "batchItemFailures": batch_item_failures
         }
 
     except Exception as e:
+        # A response without batchItemFailures would acknowledge the whole batch, so fail the invocation instead
+        # and let Lambda retry every record. Indexing is keyed on article_id, so the retry cannot duplicate articles.
         print(f"[ERROR] {str(e)}")
-        return {
-            "statusCode": 500,
-            "body": json.dumps("Processing failed.")
-        }
+        raise